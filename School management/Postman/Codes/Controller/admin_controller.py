@@ -0,0 +1,22 @@
+from flask import Blueprint, request, jsonify
+from auth import admin_session
+from slow_queries import top_offenders
+from datetime import datetime
+
+# Create a blueprint
+admin_blueprint = Blueprint('admin_blueprint', __name__)
+
+@admin_blueprint.route('/admin/slow_queries', methods=['GET'])
+def get_slow_queries():
+    try:
+        if admin_session() is None:
+            return jsonify({"error": "Admin session required"}), 403
+
+        limit = min(int(request.args.get('limit', 20)), 200)
+        since = datetime.strptime(request.args['since'], "%Y-%m-%d") if request.args.get('since') else None
+
+        return jsonify(top_offenders(limit, since)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,36 @@
+from flask import Blueprint, request, jsonify
+from admissions import IMPORT_HTTP_ROW_LIMIT, import_admissions, parse_rows
+from auth import admin_session
+
+# Create a blueprint
+admission_blueprint = Blueprint('admission_blueprint', __name__)
+
+@admission_blueprint.route('/import_admissions', methods=['POST'])
+def import_admissions_file():
+    try:
+        # Bulk hashing bypasses the password pool's queue limit, so admins only
+        if admin_session() is None:
+            return jsonify({"error": "Admin session required"}), 403
+
+        # Either an uploaded CSV/JSON file or a JSON list in the request body
+        upload = request.files.get('file')
+        if upload is not None:
+            file_format = 'csv' if upload.filename.lower().endswith('.csv') else 'json'
+            rows = parse_rows(upload.read().decode('utf-8'), file_format)
+        else:
+            rows = request.json
+            if not isinstance(rows, list):
+                return jsonify({"error": "Expected a list of admission records"}), 400
+
+        if len(rows) > IMPORT_HTTP_ROW_LIMIT:
+            return jsonify({
+                "error": f"At most {IMPORT_HTTP_ROW_LIMIT} records per request; import larger files with python admissions.py"
+            }), 413
+
+        report = import_admissions(rows)
+        report['message'] = "Admission import processed"
+        return jsonify(report), 201 if report['failed'] == 0 else 207
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,29 +1,39 @@
 from flask import Blueprint, request, jsonify
-from pymongo import MongoClient
+from database import get_collection
 from bson.objectid import ObjectId
+from reference_cache import reference_exists, existing_references
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from utils import class_members
+from attendance_rollup import record_added, record_changed, record_removed, monthly_rollup
 from datetime import datetime
 
 # Configure MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client['School']
-students_collection = db['students']
-teachers_collection = db['teachers']
-staff_collection = db['staff']
-student_attendance_collection = db['student_attendance']
-teacher_attendance_collection = db['teacher_attendance']
-staff_attendance_collection = db['staff_attendance']
+student_attendance_collection = get_collection('student_attendance')
+teacher_attendance_collection = get_collection('teacher_attendance')
+staff_attendance_collection = get_collection('staff_attendance')
 
 # Create a blueprint
 attendance_blueprint = Blueprint('attendance_blueprint', __name__)
 
+# Reference cache kind for each attendance user type; /add_teacher and
+# /add_staff store the name under 'username', as salaries also expect
+USER_REFERENCES = {
+    'student': 'student',
+    'teacher': 'teacher',
+    'staff': 'staff'
+}
+
 def user_exists(username, user_type):
-    if user_type == 'student':
-        return students_collection.find_one({"username": username}) is not None
-    elif user_type == 'teacher':
-        return teachers_collection.find_one({"user_name": username}) is not None
-    elif user_type == 'staff':
-        return staff_collection.find_one({"user_name": username}) is not None
-    return False
+    if user_type not in USER_REFERENCES:
+        return False
+    return reference_exists(USER_REFERENCES[user_type], username)
+
+def existing_users(usernames, user_type):
+    # Subset of usernames that exist, with at most one $in lookup
+    if user_type not in USER_REFERENCES:
+        return set()
+    return existing_references(USER_REFERENCES[user_type], usernames)
 
 def attendance_exists(attendance_id, user_type):
     if user_type == 'student':
@@ -43,6 +53,49 @@ def get_attendance_collection(user_type):
         return staff_attendance_collection
     return None
 
+def parse_date_range(args):
+    # Optional from_date/to_date query parameters, both inclusive
+    date_filter = {}
+    if args.get('from_date'):
+        date_filter['$gte'] = datetime.strptime(args['from_date'], "%Y-%m-%d")
+    if args.get('to_date'):
+        date_filter['$lte'] = datetime.strptime(args['to_date'], "%Y-%m-%d")
+    return date_filter
+
+def attendance_percentage_pipeline(match, group_key):
+    # Counts each status per group and derives the present percentage server-side
+    return [
+        {"$match": match},
+        {"$group": {
+            "_id": group_key,
+            "total": {"$sum": 1},
+            "present": {"$sum": {"$cond": [{"$eq": ["$status", "present"]}, 1, 0]}},
+            "absent": {"$sum": {"$cond": [{"$eq": ["$status", "absent"]}, 1, 0]}},
+            "leave": {"$sum": {"$cond": [{"$eq": ["$status", "leave"]}, 1, 0]}}
+        }},
+        {"$project": {
+            "_id": 0,
+            "user_name": "$_id",
+            "total": 1,
+            "present": 1,
+            "absent": 1,
+            "leave": 1,
+            "percentage": {"$round": [{"$multiply": [{"$divide": ["$present", "$total"]}, 100]}, 2]}
+        }},
+        {"$sort": {"user_name": 1}}
+    ]
+
+def summarize(rows):
+    total = sum(row['total'] for row in rows)
+    present = sum(row['present'] for row in rows)
+    return {
+        "total": total,
+        "present": present,
+        "absent": sum(row['absent'] for row in rows),
+        "leave": sum(row['leave'] for row in rows),
+        "percentage": round(present * 100 / total, 2) if total else 0.0
+    }
+
 @attendance_blueprint.route('/add_attendance', methods=['POST'])
 def add_attendance():
     try:
@@ -59,7 +112,12 @@ def add_attendance():
 
         collection = get_attendance_collection(user_type)
         if collection is not None:
-            collection.insert_one(attendance_data)
+            # One record per user and day, enforced by a unique index
+            try:
+                collection.insert_one(attendance_data)
+            except DuplicateKeyError:
+                return jsonify({"error": "Attendance already recorded for this date"}), 400
+            record_added(user_type, [attendance_data])
             return jsonify({"message": "Attendance record added successfully", "id": str(attendance_data['_id'])}), 201
         else:
             return jsonify({"error": "Invalid user type"}), 400
@@ -67,6 +125,81 @@ def add_attendance():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@attendance_blueprint.route('/add_bulk_attendance', methods=['POST'])
+def add_bulk_attendance():
+    try:
+        bulk_data = request.json
+        user_type = bulk_data['user_type']
+        date = datetime.strptime(bulk_data['date'], "%Y-%m-%d")
+        class_code = bulk_data.get('class_code', None)
+        records = bulk_data['records']
+
+        collection = get_attendance_collection(user_type)
+        if collection is None:
+            return jsonify({"error": "Invalid user type"}), 400
+
+        # Check every user in the roll call with one query
+        usernames = {record.get('user_name') for record in records if record.get('user_name')}
+        known_users = existing_users(usernames, user_type)
+
+        results = [None] * len(records)
+        docs = []
+        positions = []
+        seen = set()
+        for i, record in enumerate(records):
+            user_username = record.get('user_name')
+            if not user_username or 'status' not in record:
+                results[i] = {"row": i, "error": "user_name and status are required"}
+                continue
+            if user_username not in known_users:
+                results[i] = {"row": i, "user_name": user_username, "error": f"{user_type.capitalize()} not found"}
+                continue
+            if user_username in seen:
+                results[i] = {"row": i, "user_name": user_username, "error": "Duplicate user_name in roll call"}
+                continue
+            seen.add(user_username)
+            doc = dict(record)
+            doc['_id'] = ObjectId()
+            doc['user_type'] = user_type
+            doc['date'] = date
+            if class_code:
+                doc['class_code'] = class_code
+            docs.append(doc)
+            positions.append(i)
+
+        # Users already marked for this date come back as duplicate key errors,
+        # so resubmitting a roll call adds nothing and leaves the rollup alone
+        failed_docs = {}
+        if docs:
+            try:
+                collection.insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                for write_error in e.details.get('writeErrors', []):
+                    if write_error.get('code') == 11000:
+                        failed_docs[write_error['index']] = "Attendance already recorded for this date"
+                    else:
+                        failed_docs[write_error['index']] = write_error['errmsg']
+
+        for doc_index, (doc, i) in enumerate(zip(docs, positions)):
+            if doc_index in failed_docs:
+                results[i] = {"row": i, "user_name": doc['user_name'], "error": failed_docs[doc_index]}
+            else:
+                results[i] = {"row": i, "user_name": doc['user_name'], "id": str(doc['_id'])}
+
+        record_added(user_type, [doc for doc_index, doc in enumerate(docs) if doc_index not in failed_docs])
+
+        inserted = sum(1 for result in results if 'id' in result)
+        summary = {
+            "message": "Bulk attendance processed",
+            "inserted": inserted,
+            "failed": len(results) - inserted,
+            "results": results
+        }
+        return jsonify(summary), 201 if inserted == len(results) else 207
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @attendance_blueprint.route('/update_attendance/<attendance_id>', methods=['PUT'])
 def update_attendance(attendance_id):
     try:
@@ -87,8 +220,15 @@ def update_attendance(attendance_id):
 
         collection = get_attendance_collection(user_type)
         if collection is not None:
-            result = collection.update_one({"_id": ObjectId(attendance_id)}, {"$set": attendance_data})
-            if result.matched_count > 0:
+            # Fetch the previous version so the rollup can move the record between buckets
+            try:
+                previous = collection.find_one_and_update(
+                    {"_id": ObjectId(attendance_id)}, {"$set": attendance_data}, return_document=ReturnDocument.BEFORE
+                )
+            except DuplicateKeyError:
+                return jsonify({"error": "Attendance already recorded for this date"}), 400
+            if previous is not None:
+                record_changed(user_type, previous, {**previous, **attendance_data})
                 return jsonify({"message": "Attendance record updated successfully"}), 200
             else:
                 return jsonify({"error": "Attendance record not found"}), 404
@@ -109,8 +249,9 @@ def delete_attendance(attendance_id):
 
         collection = get_attendance_collection(user_type)
         if collection is not None:
-            result = collection.delete_one({"_id": ObjectId(attendance_id)})
-            if result.deleted_count > 0:
+            deleted = collection.find_one_and_delete({"_id": ObjectId(attendance_id)})
+            if deleted is not None:
+                record_removed(user_type, deleted)
                 return jsonify({"message": "Attendance record deleted successfully"}), 200
             else:
                 return jsonify({"error": "Attendance record not found"}), 404
@@ -119,3 +260,69 @@ def delete_attendance(attendance_id):
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@attendance_blueprint.route('/attendance_report/<user_type>/<user_name>', methods=['GET'])
+def get_user_attendance_report(user_type, user_name):
+    try:
+        collection = get_attendance_collection(user_type)
+        if collection is None:
+            return jsonify({"error": "Invalid user type"}), 400
+
+        match = {"user_name": user_name}
+        date_filter = parse_date_range(request.args)
+        if date_filter:
+            match['date'] = date_filter
+
+        rows = list(collection.aggregate(attendance_percentage_pipeline(match, "$user_name")))
+        if not rows:
+            return jsonify({"error": "No attendance records found"}), 404
+
+        return jsonify(rows[0]), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@attendance_blueprint.route('/attendance_report/<user_type>', methods=['GET'])
+def get_attendance_report(user_type):
+    try:
+        collection = get_attendance_collection(user_type)
+        if collection is None:
+            return jsonify({"error": "Invalid user type"}), 400
+
+        match = {}
+        date_filter = parse_date_range(request.args)
+        if date_filter:
+            match['date'] = date_filter
+
+        class_code = request.args.get('class_code')
+        if class_code:
+            if user_type != 'student':
+                return jsonify({"error": "class_code filter applies to students only"}), 400
+            # Records from the bulk roll call carry the class code; older ones
+            # are matched through the students enrolled in the class
+            match['$or'] = [
+                {"class_code": class_code},
+                {"user_name": {"$in": class_members(class_code)}}
+            ]
+
+        rows = list(collection.aggregate(attendance_percentage_pipeline(match, "$user_name")))
+
+        return jsonify({"summary": summarize(rows), "users": rows}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@attendance_blueprint.route('/attendance_monthly_report/<user_type>/<user_name>', methods=['GET'])
+def get_monthly_attendance_report(user_type, user_name):
+    try:
+        if get_attendance_collection(user_type) is None:
+            return jsonify({"error": "Invalid user type"}), 400
+
+        # Read from the rollup instead of scanning raw records; months are YYYY-MM
+        months = monthly_rollup(user_type, user_name, request.args.get('from_month'), request.args.get('to_month'))
+        for month in months:
+            for status in ('present', 'absent', 'leave'):
+                month.setdefault(status, 0)
+            month['percentage'] = round(month['present'] * 100 / month['total'], 2) if month['total'] else 0.0
+
+        return jsonify({"summary": summarize(months), "months": months}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,26 +1,14 @@
 from flask import Blueprint, request, jsonify
-from pymongo import MongoClient
+from database import get_collection
 from bson.objectid import ObjectId
+from reference_cache import reference_exists, invalidate_reference
 
 # Configure MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client['School']
-teachers_collection = db['teachers']
-students_collection = db['students']
-classes_collection = db['classes']
+classes_collection = get_collection('classes')
 
 # Create a blueprint
 class_blueprint = Blueprint('class_blueprint', __name__)
 
-def teacher_exists(username):
-    return teachers_collection.find_one({"user_name": username}) is not None
-
-def student_exists(username):
-    return students_collection.find_one({"username": username}) is not None
-
-def class_exists(class_code):
-    return classes_collection.find_one({"class_code": class_code}) is not None
-
 @class_blueprint.route('/add_class', methods=['POST'])
 def add_class():
     try:
@@ -30,15 +18,15 @@ def add_class():
         student_username = class_data['student_user_name']
         
         # Check if the class already exists in the classes collection
-        if class_exists(class_code):
+        if reference_exists('class', class_code):
             return jsonify({"error": "Class already exists"}), 400
 
         # Check if the teacher exists in the teachers collection
-        if not teacher_exists(teacher_username):
+        if not reference_exists('teacher_user_name', teacher_username):
             return jsonify({"error": "Teacher not found"}), 404
 
         # Check if the student exists in the students collection
-        if not student_exists(student_username):
+        if not reference_exists('student', student_username):
             return jsonify({"error": "Student not found"}), 404
 
         classes_collection.insert_one(class_data)
@@ -55,18 +43,20 @@ def update_class(class_code):
         student_username = class_data.get('student_user_name', None)
         
         # Check if the class exists in the classes collection
-        if not class_exists(class_code):
+        if not reference_exists('class', class_code):
             return jsonify({"error": "Class not found"}), 404
 
         # Check if the teacher exists in the teachers collection
-        if teacher_username and not teacher_exists(teacher_username):
+        if teacher_username and not reference_exists('teacher_user_name', teacher_username):
             return jsonify({"error": "Teacher not found"}), 404
 
         # Check if the student exists in the students collection
-        if student_username and not student_exists(student_username):
+        if student_username and not reference_exists('student', student_username):
             return jsonify({"error": "Student not found"}), 404
 
         result = classes_collection.update_one({"class_code": class_code}, {"$set": class_data})
+        # The update may rename the class code
+        invalidate_reference('class', class_code)
 
         if result.matched_count > 0:
             return jsonify({"message": "Class updated successfully"}), 200
@@ -79,10 +69,11 @@ def update_class(class_code):
 def delete_class(class_code):
     try:
         # Check if the class exists in the classes collection
-        if not class_exists(class_code):
+        if not reference_exists('class', class_code):
             return jsonify({"error": "Class not found"}), 404
 
         result = classes_collection.delete_one({"class_code": class_code})
+        invalidate_reference('class', class_code)
 
         if result.deleted_count > 0:
             return jsonify({"message": "Class deleted successfully"}), 200
@@ -1,24 +1,16 @@
 from flask import Blueprint, request, jsonify
-from pymongo import MongoClient
+from database import get_collection
 from bson.objectid import ObjectId
+from reference_cache import reference_exists
+from exam_analytics import invalidate_exam
 from datetime import datetime
 
 # Configure MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client['School']
-classes_collection = db['classes']
-subjects_collection = db['subjects']
-exams_collection = db['exams']
+exams_collection = get_collection('exams')
 
 # Create a blueprint
 exam_blueprint = Blueprint('exam_blueprint', __name__)
 
-def class_exists(class_code):
-    return classes_collection.find_one({"class_code": class_code}) is not None
-
-def subject_exists(subject_code):
-    return subjects_collection.find_one({"subject_code": subject_code}) is not None
-
 def exam_exists(exam_id):
     return exams_collection.find_one({"_id": ObjectId(exam_id)}) is not None
 
@@ -30,11 +22,11 @@ def add_exam():
         subject_code = exam_data['subject_code']
         
         # Check if the class exists in the classes collection
-        if not class_exists(class_code):
+        if not reference_exists('class', class_code):
             return jsonify({"error": "Class not found"}), 404
 
         # Check if the subject exists in the subjects collection
-        if not subject_exists(subject_code):
+        if not reference_exists('subject', subject_code):
             return jsonify({"error": "Subject not found"}), 404
 
         exam_data['_id'] = ObjectId()
@@ -58,11 +50,11 @@ def update_exam(exam_id):
             return jsonify({"error": "Exam not found"}), 404
 
         # Check if the class exists in the classes collection
-        if class_code and not class_exists(class_code):
+        if class_code and not reference_exists('class', class_code):
             return jsonify({"error": "Class not found"}), 404
 
         # Check if the subject exists in the subjects collection
-        if subject_code and not subject_exists(subject_code):
+        if subject_code and not reference_exists('subject', subject_code):
             return jsonify({"error": "Subject not found"}), 404
 
         if 'exam_date' in exam_data:
@@ -85,6 +77,7 @@ def delete_exam(exam_id):
             return jsonify({"error": "Exam not found"}), 404
 
         result = exams_collection.delete_one({"_id": ObjectId(exam_id)})
+        invalidate_exam(exam_id)
 
         if result.deleted_count > 0:
             return jsonify({"message": "Exam deleted successfully"}), 200
@@ -1,20 +1,17 @@
 from flask import Blueprint, request, jsonify
-from pymongo import MongoClient
+from database import get_collection
 from bson.objectid import ObjectId
+from reference_cache import reference_exists
+from exam_analytics import exam_statistics, invalidate_exam
+from pymongo import ReturnDocument
 
 # Configure MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client['School']
-students_collection = db['students']
-exams_collection = db['exams']
-exam_results_collection = db['exam_results']
+exams_collection = get_collection('exams')
+exam_results_collection = get_collection('exam_results')
 
 # Create a blueprint
 exam_results_blueprint = Blueprint('exam_results_blueprint', __name__)
 
-def student_exists(username):
-    return students_collection.find_one({"username": username}) is not None
-
 def exam_exists(exam_id):
     return exams_collection.find_one({"_id": ObjectId(exam_id)}) is not None
 
@@ -29,7 +26,7 @@ def add_exam_result():
         exam_id = result_data['exam']
         
         # Check if the student exists in the students collection
-        if not student_exists(student_username):
+        if not reference_exists('student', student_username):
             return jsonify({"error": "Student not found"}), 404
 
         # Check if the exam exists in the exams collection
@@ -39,6 +36,7 @@ def add_exam_result():
         result_data['_id'] = ObjectId()
 
         exam_results_collection.insert_one(result_data)
+        invalidate_exam(exam_id)
 
         return jsonify({"message": "Exam result added successfully", "id": str(result_data['_id'])}), 201
     except Exception as e:
@@ -56,16 +54,22 @@ def update_exam_result(result_id):
             return jsonify({"error": "Exam result not found"}), 404
 
         # Check if the student exists in the students collection
-        if student_username and not student_exists(student_username):
+        if student_username and not reference_exists('student', student_username):
             return jsonify({"error": "Student not found"}), 404
 
         # Check if the exam exists in the exams collection
         if exam_id and not exam_exists(exam_id):
             return jsonify({"error": "Exam not found"}), 404
 
-        result = exam_results_collection.update_one({"_id": ObjectId(result_id)}, {"$set": result_data})
+        previous = exam_results_collection.find_one_and_update(
+            {"_id": ObjectId(result_id)}, {"$set": result_data}, return_document=ReturnDocument.BEFORE
+        )
 
-        if result.matched_count > 0:
+        if previous is not None:
+            # The result may have moved to another exam
+            invalidate_exam(previous['exam'])
+            if exam_id:
+                invalidate_exam(exam_id)
             return jsonify({"message": "Exam result updated successfully"}), 200
         else:
             return jsonify({"error": "Exam result not found"}), 404
@@ -79,11 +83,35 @@ def delete_exam_result(result_id):
         if not exam_result_exists(result_id):
             return jsonify({"error": "Exam result not found"}), 404
 
-        result = exam_results_collection.delete_one({"_id": ObjectId(result_id)})
+        deleted = exam_results_collection.find_one_and_delete({"_id": ObjectId(result_id)})
 
-        if result.deleted_count > 0:
+        if deleted is not None:
+            invalidate_exam(deleted['exam'])
             return jsonify({"message": "Exam result deleted successfully"}), 200
         else:
             return jsonify({"error": "Exam result not found"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@exam_results_blueprint.route('/exam_statistics/<exam_id>', methods=['GET'])
+def get_exam_statistics(exam_id):
+    try:
+        statistics = exam_statistics(exam_id)
+
+        if statistics is None:
+            return jsonify({"error": "No scored results for exam"}), 404
+
+        class_code = request.args.get('class_code')
+        if class_code:
+            if class_code not in statistics['classes']:
+                return jsonify({"error": "No scored results for class"}), 404
+            return jsonify({
+                **statistics['classes'][class_code],
+                "exam": exam_id,
+                "class": class_code,
+                "rankings": [entry for entry in statistics['rankings'] if entry['class'] == class_code]
+            }), 200
+
+        return jsonify(statistics), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
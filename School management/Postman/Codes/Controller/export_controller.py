@@ -0,0 +1,131 @@
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from database import get_collection
+from auth import admin_session
+from utils import class_members, json_value
+from json_provider import dumps
+from bson.decimal128 import Decimal128
+from bson.objectid import ObjectId
+from datetime import datetime
+import csv
+import io
+
+# Create a blueprint
+export_blueprint = Blueprint('export_blueprint', __name__)
+
+# Collections that can be exported, with the field used for date-range
+# filters and how a class filter applies: directly on a class field, or
+# through the students enrolled in the class.
+EXPORTS = {
+    'fees': {'date_field': 'due_date', 'student_field': 'student_username'},
+    'teacher_salaries': {'date_field': 'payment_date'},
+    'staff_salaries': {'date_field': 'payment_date'},
+    'student_attendance': {'date_field': 'date', 'class_field': 'class_code', 'student_field': 'user_name'},
+    'teacher_attendance': {'date_field': 'date'},
+    'staff_attendance': {'date_field': 'date'},
+    'exams': {'date_field': 'exam_date', 'class_field': 'class_code'},
+    'exam_results': {'student_field': 'student'},
+    'students': {'class_field': 'class_details.current_class'},
+    'timetable': {'class_field': 'class_code'},
+    'classes': {'class_field': 'class_code'},
+    'subjects': {},
+    'teachers': {'date_field': 'hire_date'},
+    'staff': {'date_field': 'hire_date'},
+    'users': {'date_field': 'added_at', 'excluded_fields': ['password']},
+}
+
+EXPORT_BATCH_SIZE = 1000
+
+def strip_bytes(doc):
+    # Binary fields (password hashes) never leave the server
+    return {key: strip_bytes(value) if isinstance(value, dict) else value
+            for key, value in doc.items() if not isinstance(value, bytes)}
+
+def flatten(doc, prefix=''):
+    row = {}
+    for key, value in doc.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            row.update(flatten(value, f"{name}."))
+        elif isinstance(value, list):
+            row[name] = dumps(value)
+        elif isinstance(value, (ObjectId, datetime, Decimal128)):
+            row[name] = json_value(value)
+        else:
+            row[name] = value
+    return row
+
+def build_export_query(spec, args):
+    query = {}
+    date_field = spec.get('date_field')
+    if date_field:
+        date_filter = {}
+        if args.get('from_date'):
+            date_filter['$gte'] = datetime.strptime(args['from_date'], "%Y-%m-%d")
+        if args.get('to_date'):
+            date_filter['$lte'] = datetime.strptime(args['to_date'], "%Y-%m-%d")
+        if date_filter:
+            query[date_field] = date_filter
+
+    class_code = args.get('class_code')
+    if class_code:
+        conditions = []
+        if 'class_field' in spec:
+            conditions.append({spec['class_field']: class_code})
+        if 'student_field' in spec:
+            conditions.append({spec['student_field']: {"$in": class_members(class_code)}})
+        if not conditions:
+            raise ValueError("class_code filter is not supported for this collection")
+        query['$or'] = conditions
+    return query
+
+def ndjson_stream(cursor):
+    for doc in cursor:
+        yield dumps(strip_bytes(doc)) + '\n'
+
+def csv_stream(cursor, fields):
+    # Columns come from ?fields= or from the first document; later documents
+    # are written against the same header and extra keys are dropped.
+    buffer = io.StringIO()
+    writer = None
+    for doc in cursor:
+        row = flatten(strip_bytes(doc))
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=fields or list(row), extrasaction='ignore')
+            writer.writeheader()
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+@export_blueprint.route('/export/<collection_name>', methods=['GET'])
+def export_collection(collection_name):
+    try:
+        # Full dumps include personal details, salaries and fees
+        if admin_session() is None:
+            return jsonify({"error": "Admin session required"}), 403
+
+        spec = EXPORTS.get(collection_name)
+        if spec is None:
+            return jsonify({"error": "Collection cannot be exported"}), 404
+
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in ('ndjson', 'csv'):
+            return jsonify({"error": "Format must be ndjson or csv"}), 400
+
+        query = build_export_query(spec, request.args)
+        fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()]
+        projection = {field: 0 for field in spec.get('excluded_fields', [])} or None
+
+        cursor = get_collection(collection_name).find(query, projection).batch_size(EXPORT_BATCH_SIZE)
+
+        if export_format == 'csv':
+            body, mimetype = csv_stream(cursor, fields), 'text/csv'
+        else:
+            body, mimetype = ndjson_stream(cursor), 'application/x-ndjson'
+
+        headers = {"Content-Disposition": f"attachment; filename={collection_name}.{export_format}"}
+        return Response(stream_with_context(body), mimetype=mimetype, headers=headers)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,19 +1,26 @@
 from flask import Blueprint, request, jsonify
-from pymongo import MongoClient
+from database import get_collection
 from bson.objectid import ObjectId
+from reference_cache import reference_exists
+from pagination import paginate, field_projection
+from utils import class_members
+from fee_ledger import fee_added, fee_changed, fee_removed, payment_recorded
+from pymongo import ReturnDocument, ASCENDING
 from datetime import datetime
 
 # Configure MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client['School']
-students_collection = db['students']
-fees_collection = db['fees']
+fees_collection = get_collection('fees')
+fee_payments_collection = get_collection('fee_payments')
+fee_balances_collection = get_collection('fee_balances')
 
 # Create a blueprint
 fees_blueprint = Blueprint('fees_blueprint', __name__)
 
-def student_exists(username):
-    return students_collection.find_one({"username": username}) is not None
+# Pipeline-update expression deriving a fee's status from what has been paid
+FEE_STATUS = {"$switch": {"branches": [
+    {"case": {"$gte": [{"$ifNull": ["$paid_amount", 0]}, "$amount"]}, "then": "paid"},
+    {"case": {"$gt": [{"$ifNull": ["$paid_amount", 0]}, 0]}, "then": "partial"}
+], "default": "pending"}}
 
 def fee_exists(fee_id):
     return fees_collection.find_one({"_id": ObjectId(fee_id)}) is not None
@@ -25,13 +32,17 @@ def add_fee():
         student_username = fee_data['student_username']
         
         # Check if the student exists in the students collection
-        if not student_exists(student_username):
+        if not reference_exists('student', student_username):
             return jsonify({"error": "Student not found"}), 404
 
         fee_data['_id'] = ObjectId()
         fee_data['due_date'] = datetime.strptime(fee_data['due_date'], "%Y-%m-%d")
+        # Payments are recorded through /add_fee_payment, which also moves the status on
+        fee_data['paid_amount'] = 0
+        fee_data['status'] = 'pending'
 
         fees_collection.insert_one(fee_data)
+        fee_added(fee_data)
 
         return jsonify({"message": "Fee record added successfully", "id": str(fee_data['_id'])}), 201
     except Exception as e:
@@ -48,15 +59,28 @@ def update_fee(fee_id):
             return jsonify({"error": "Fee record not found"}), 404
 
         # Check if the student exists in the students collection
-        if student_username and not student_exists(student_username):
+        if student_username and not reference_exists('student', student_username):
             return jsonify({"error": "Student not found"}), 404
 
         if 'due_date' in fee_data:
             fee_data['due_date'] = datetime.strptime(fee_data['due_date'], "%Y-%m-%d")
 
-        result = fees_collection.update_one({"_id": ObjectId(fee_id)}, {"$set": fee_data})
-
-        if result.matched_count > 0:
+        # The paid amount is maintained by /add_fee_payment only, and the
+        # status is derived again in case the amount changed
+        fee_data.pop('paid_amount', None)
+        fee_data.pop('status', None)
+
+        previous = fees_collection.find_one_and_update(
+            {"_id": ObjectId(fee_id)},
+            [
+                {"$set": {field: {"$literal": value} for field, value in fee_data.items()}},
+                {"$set": {"status": FEE_STATUS}}
+            ],
+            return_document=ReturnDocument.BEFORE
+        )
+
+        if previous is not None:
+            fee_changed(previous, {**previous, **fee_data})
             return jsonify({"message": "Fee record updated successfully"}), 200
         else:
             return jsonify({"error": "Fee record not found"}), 404
@@ -70,11 +94,136 @@ def delete_fee(fee_id):
         if not fee_exists(fee_id):
             return jsonify({"error": "Fee record not found"}), 404
 
-        result = fees_collection.delete_one({"_id": ObjectId(fee_id)})
+        deleted = fees_collection.find_one_and_delete({"_id": ObjectId(fee_id)})
 
-        if result.deleted_count > 0:
+        if deleted is not None:
+            fee_removed(deleted)
             return jsonify({"message": "Fee record deleted successfully"}), 200
         else:
             return jsonify({"error": "Fee record not found"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@fees_blueprint.route('/list_fees', methods=['GET'])
+def list_fees():
+    try:
+        query = {}
+        for field in ('student_username', 'status'):
+            if request.args.get(field):
+                query[field] = request.args[field]
+
+        due_date = {}
+        if request.args.get('due_from'):
+            due_date['$gte'] = datetime.strptime(request.args['due_from'], "%Y-%m-%d")
+        if request.args.get('due_to'):
+            due_date['$lte'] = datetime.strptime(request.args['due_to'], "%Y-%m-%d")
+        if due_date:
+            query['due_date'] = due_date
+
+        page = paginate(fees_collection, query, request.args, projection=field_projection(request.args))
+        return jsonify(page), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@fees_blueprint.route('/add_fee_payment', methods=['POST'])
+def add_fee_payment():
+    try:
+        payment_data = request.json
+        fee_id = payment_data['fee_id']
+        amount = payment_data['amount']
+
+        if not isinstance(amount, (int, float)) or amount <= 0:
+            return jsonify({"error": "Payment amount must be a positive number"}), 400
+
+        # Apply the payment only if it does not exceed what is still owed. The
+        # status is derived in the same pipeline update, so concurrent payments
+        # can't leave a fully paid fee marked partial.
+        fee = fees_collection.find_one_and_update(
+            {
+                "_id": ObjectId(fee_id),
+                "$expr": {"$lte": [{"$add": [{"$ifNull": ["$paid_amount", 0]}, amount]}, "$amount"]}
+            },
+            [
+                {"$set": {"paid_amount": {"$add": [{"$ifNull": ["$paid_amount", 0]}, amount]}}},
+                {"$set": {"status": FEE_STATUS}}
+            ],
+            return_document=ReturnDocument.AFTER
+        )
+        if fee is None:
+            if not fee_exists(fee_id):
+                return jsonify({"error": "Fee record not found"}), 404
+            return jsonify({"error": "Payment exceeds the outstanding amount"}), 400
+
+        payment_doc = {
+            '_id': ObjectId(),
+            'fee_id': fee['_id'],
+            'student_username': fee['student_username'],
+            'amount': amount,
+            'payment_date': datetime.strptime(payment_data['payment_date'], "%Y-%m-%d") if 'payment_date' in payment_data else datetime.utcnow(),
+            'method': payment_data.get('method', '')
+        }
+        fee_payments_collection.insert_one(payment_doc)
+        payment_recorded(fee['student_username'], amount)
+
+        return jsonify({
+            "message": "Fee payment recorded successfully",
+            "id": str(payment_doc['_id']),
+            "status": fee['status'],
+            "outstanding": fee['amount'] - fee['paid_amount']
+        }), 201
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@fees_blueprint.route('/fee_balance/<student_username>', methods=['GET'])
+def get_fee_balance(student_username):
+    try:
+        balance = fee_balances_collection.find_one({"student_username": student_username}, {"_id": 0})
+
+        if balance:
+            return jsonify(balance), 200
+        else:
+            return jsonify({"error": "No fee records for student"}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@fees_blueprint.route('/outstanding_fees', methods=['GET'])
+def get_outstanding_fees():
+    try:
+        query = {"balance": {"$gt": 0}}
+        if request.args.get('class_code'):
+            query['student_username'] = {"$in": class_members(request.args['class_code'])}
+
+        balances = list(fee_balances_collection.find(query, {"_id": 0}).sort("student_username", ASCENDING))
+
+        return jsonify({
+            "total_outstanding": sum(balance['balance'] for balance in balances),
+            "students": balances
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@fees_blueprint.route('/overdue_fees', methods=['GET'])
+def get_overdue_fees():
+    try:
+        as_of = request.args.get('as_of')
+        as_of = datetime.strptime(as_of, "%Y-%m-%d") if as_of else datetime.utcnow()
+
+        match = {"due_date": {"$lt": as_of}, "status": {"$ne": "paid"}}
+        if request.args.get('class_code'):
+            match['student_username'] = {"$in": class_members(request.args['class_code'])}
+
+        pipeline = [
+            {"$match": match},
+            {"$addFields": {"outstanding": {"$subtract": ["$amount", {"$ifNull": ["$paid_amount", 0]}]}}},
+            {"$match": {"outstanding": {"$gt": 0}}},
+            {"$sort": {"due_date": 1}}
+        ]
+        fees = list(fees_collection.aggregate(pipeline))
+
+        return jsonify({
+            "as_of": as_of.strftime("%Y-%m-%d"),
+            "total_overdue": sum(fee['outstanding'] for fee in fees),
+            "fees": fees
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,43 @@
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from report_cards import assemble_report_cards, build_report_card, stream_report_cards
+from datetime import datetime
+
+# Create a blueprint
+report_card_blueprint = Blueprint('report_card_blueprint', __name__)
+
+def report_period(args):
+    from_date = datetime.strptime(args['from_date'], "%Y-%m-%d") if args.get('from_date') else None
+    to_date = datetime.strptime(args['to_date'], "%Y-%m-%d") if args.get('to_date') else None
+    return from_date, to_date
+
+@report_card_blueprint.route('/report_card/<username>', methods=['GET'])
+def get_report_card(username):
+    try:
+        students, exams = assemble_report_cards({"username": username}, *report_period(request.args))
+        if not students:
+            return jsonify({"error": "Student not found"}), 404
+        card = build_report_card(students[0], exams)
+        return jsonify(card), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@report_card_blueprint.route('/report_cards/<class_code>', methods=['GET'])
+def get_class_report_cards(class_code):
+    try:
+        output_format = request.args.get('format', 'json')
+        if output_format not in ('json', 'html'):
+            return jsonify({"error": "Format must be json or html"}), 400
+
+        students, exams = assemble_report_cards({"class_details.current_class": class_code}, *report_period(request.args))
+        if not students:
+            return jsonify({"error": "No students found for this class"}), 404
+
+        mimetype = 'text/html' if output_format == 'html' else 'application/json'
+        body = stream_report_cards(students, exams, output_format)
+        return Response(stream_with_context(body), mimetype=mimetype)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
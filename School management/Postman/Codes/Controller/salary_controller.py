@@ -1,24 +1,25 @@
 from flask import Blueprint, request, jsonify
-from pymongo import MongoClient
+from database import get_collection
 from bson.objectid import ObjectId
+from reference_cache import reference_exists
+from pymongo import UpdateOne
 from datetime import datetime
+import calendar
 
 # Configure MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client['School']
-teachers_collection = db['teachers']
-staff_collection = db['staff']
-teacher_salaries_collection = db['teacher_salaries']
-staff_salaries_collection = db['staff_salaries']
+teacher_salaries_collection = get_collection('teacher_salaries')
+staff_salaries_collection = get_collection('staff_salaries')
+salary_structures_collection = get_collection('salary_structures')
+users_collection = get_collection('users')
+staff_collection = get_collection('staff')
 
 # Create a blueprint
 salary_blueprint = Blueprint('salary_blueprint', __name__)
 
 def user_exists(username, user_type):
-    if user_type == 'teacher':
-        return teachers_collection.find_one({"user_name": username}) is not None
-    elif user_type == 'staff':
-        return staff_collection.find_one({"user_name": username}) is not None
+    # Teachers and staff are stored under 'username' by their own controllers
+    if user_type in ('teacher', 'staff'):
+        return reference_exists(user_type, username)
     return False
 
 def salary_exists(salary_id, user_type):
@@ -35,6 +36,50 @@ def get_salaries_collection(user_type):
         return staff_salaries_collection
     return None
 
+def build_salary_structure(structure_data):
+    return {
+        'basic': structure_data.get('basic', 0),
+        'allowances': structure_data.get('allowances', {}),
+        'deductions': structure_data.get('deductions', {}),
+        'department': structure_data.get('department', '')
+    }
+
+def staff_departments(usernames):
+    # Department recorded on staff documents, for structures that don't set one
+    cursor = staff_collection.find(
+        {"username": {"$in": list(usernames)}}, {"username": 1, "department_details.department_name": 1, "_id": 0}
+    )
+    return {doc['username']: doc.get('department_details', {}).get('department_name', '') for doc in cursor}
+
+def build_payroll_doc(structure, month, payment_date, department):
+    gross = structure.get('basic', 0) + sum(structure.get('allowances', {}).values())
+    deductions = sum(structure.get('deductions', {}).values())
+    return {
+        '_id': ObjectId(),
+        'user_name': structure['user_name'],
+        'user_type': structure['user_type'],
+        'payroll_month': month,
+        'department': department,
+        'gross': gross,
+        'deductions': deductions,
+        'amount': gross - deductions,
+        'payment_date': payment_date,
+        'status': 'pending'
+    }
+
+def payroll_summary(month):
+    pipeline = [
+        {"$match": {"payroll_month": month}},
+        {"$group": {"_id": "$department", "employees": {"$sum": 1}, "total": {"$sum": "$amount"}}}
+    ]
+    departments = {}
+    for collection in (teacher_salaries_collection, staff_salaries_collection):
+        for row in collection.aggregate(pipeline):
+            department = departments.setdefault(row['_id'] or 'Unassigned', {"employees": 0, "total": 0})
+            department['employees'] += row['employees']
+            department['total'] += row['total']
+    return departments
+
 @salary_blueprint.route('/add_salary', methods=['POST'])
 def add_salary():
     try:
@@ -111,3 +156,83 @@ def delete_salary(salary_id):
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@salary_blueprint.route('/set_salary_structure', methods=['PUT'])
+def set_salary_structure():
+    try:
+        structure_data = request.json
+        user_username = structure_data['user_name']
+        user_type = structure_data['user_type']
+
+        # Check if the user exists in the respective collection
+        if not user_exists(user_username, user_type):
+            return jsonify({"error": f"{user_type.capitalize()} not found"}), 404
+
+        structure_doc = build_salary_structure(structure_data)
+        structure_doc['updated_at'] = datetime.utcnow()
+
+        salary_structures_collection.update_one(
+            {"user_type": user_type, "user_name": user_username}, {"$set": structure_doc}, upsert=True
+        )
+
+        return jsonify({"message": "Salary structure saved successfully"}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@salary_blueprint.route('/run_payroll', methods=['POST'])
+def run_payroll():
+    try:
+        payroll_data = request.json
+        period = datetime.strptime(payroll_data['month'], "%Y-%m")
+        # Normalised so "2024-3" and "2024-03" are the same payroll month
+        month = period.strftime("%Y-%m")
+
+        if 'payment_date' in payroll_data:
+            payment_date = datetime.strptime(payroll_data['payment_date'], "%Y-%m-%d")
+        else:
+            payment_date = period.replace(day=calendar.monthrange(period.year, period.month)[1])
+
+        structures = list(salary_structures_collection.find({"user_type": {"$in": ['teacher', 'staff']}}))
+
+        # Only employees whose user account is active are paid
+        usernames = {structure['user_name'] for structure in structures}
+        active = {doc['username'] for doc in users_collection.find(
+            {"username": {"$in": list(usernames)}, "status": "active"}, {"username": 1, "_id": 0}
+        )}
+        departments = staff_departments(
+            structure['user_name'] for structure in structures if structure['user_type'] == 'staff'
+        )
+
+        operations = {'teacher': [], 'staff': []}
+        skipped = []
+        for structure in structures:
+            if structure['user_name'] not in active:
+                skipped.append(structure['user_name'])
+                continue
+            department = structure.get('department') or (
+                departments.get(structure['user_name'], '') if structure['user_type'] == 'staff' else 'Teaching'
+            )
+            salary_doc = build_payroll_doc(structure, month, payment_date, department)
+            # $setOnInsert keyed on the month makes a rerun a no-op for records already generated
+            operations[structure['user_type']].append(UpdateOne(
+                {"user_name": structure['user_name'], "payroll_month": month},
+                {"$setOnInsert": salary_doc},
+                upsert=True
+            ))
+
+        created = 0
+        for user_type, user_operations in operations.items():
+            if user_operations:
+                result = get_salaries_collection(user_type).bulk_write(user_operations, ordered=False)
+                created += result.upserted_count
+
+        return jsonify({
+            "message": "Payroll run completed",
+            "month": month,
+            "created": created,
+            "already_present": sum(len(ops) for ops in operations.values()) - created,
+            "skipped_inactive": skipped,
+            "departments": payroll_summary(month)
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
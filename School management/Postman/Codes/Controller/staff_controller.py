@@ -1,21 +1,18 @@
 from flask import Blueprint, request, jsonify
-from pymongo import MongoClient
+from database import get_collection
 from bson.objectid import ObjectId
 from utils import user_exists  # Importing the user_exists function
+from reference_cache import reference_exists, invalidate_reference
+from pagination import paginate, field_projection
 from datetime import datetime
 
 # Configure MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client['School']
-users_collection = db['users']
-staff_collection = db['staff']
+users_collection = get_collection('users')
+staff_collection = get_collection('staff')
 
 # Create a blueprint
 staff_blueprint = Blueprint('staff_blueprint', __name__)
 
-def staff_exists(username):
-    return staff_collection.find_one({"username": username}) is not None
-
 def build_experience_section(experience_data):
     return {
         'years_of_experience': experience_data.get('years_of_experience', 0),
@@ -47,7 +44,7 @@ def add_staff():
             return jsonify({"error": "Username does not exist"}), 400
         
         # Check if the staff already exists in the staff collection
-        if staff_exists(username):
+        if reference_exists('staff', username):
             return jsonify({"error": "Staff member already exists"}), 400
         
         staff_doc = {
@@ -72,7 +69,7 @@ def update_staff(username):
         staff_data = request.json
         
         # Check if the staff exists in the staff collection
-        if not staff_exists(username):
+        if not reference_exists('staff', username):
             return jsonify({"error": "Staff member not found"}), 404
         
         update_doc = {
@@ -98,10 +95,12 @@ def update_staff(username):
 def delete_staff(username):
     try:
         # Check if the staff exists in the staff collection
-        if not staff_exists(username):
+        if not reference_exists('staff', username):
             return jsonify({"error": "Staff member not found"}), 404
         
         result = staff_collection.delete_one({"username": username})
+        invalidate_reference('staff', username)
+        invalidate_reference('staff_user_name', username)
 
         if result.deleted_count > 0:
             return jsonify({"message": "Staff member deleted successfully"}), 200
@@ -109,3 +108,17 @@ def delete_staff(username):
             return jsonify({"error": "Staff member not found"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@staff_blueprint.route('/list_staff', methods=['GET'])
+def list_staff():
+    try:
+        query = {}
+        for field in ('department_name', 'position'):
+            if request.args.get(field):
+                query[f'department_details.{field}'] = request.args[field]
+
+        page = paginate(staff_collection, query, request.args, sort_field='username',
+                        projection=field_projection(request.args))
+        return jsonify(page), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
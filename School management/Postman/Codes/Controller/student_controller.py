@@ -1,13 +1,13 @@
 from flask import Blueprint, request, jsonify
-from pymongo import MongoClient
+from database import get_collection
 from bson.objectid import ObjectId
 from utils import user_exists  # Importing the user_exists function
+from reference_cache import reference_exists
+from pagination import paginate, field_projection
+from response_cache import cached_document_response, conditional_response, invalidate_response
 
 # Configure MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client['School']
-users_collection = db['users']
-students_collection = db['students']
+students_collection = get_collection('students')
 
 # Create a blueprint
 student_blueprint = Blueprint('student_blueprint', __name__)
@@ -51,6 +51,19 @@ def build_guardian_info(guardian_data):
         }
     }
 
+def build_student_doc(student_data):
+    return {
+        '_id': ObjectId(),
+        'username': student_data['username'],
+        'class_details': build_class_details(student_data.get('class_details', {})),
+        'enrollment_date': student_data.get('enrollment_date', ''),
+        'education': build_education_section(student_data.get('education', {})),
+        'guardian_info': build_guardian_info(student_data.get('guardian_info', {}))
+    }
+
+def student_json(student):
+    return jsonify(student).get_data()
+
 @student_blueprint.route('/add_student', methods=['POST'])
 def add_student():
     try:
@@ -63,24 +76,16 @@ def add_student():
 
         # Check if the username exists in the users collection
         if not user_exists(username):
-            all_users = list(users_collection.find({}))
-            print('All users in collection:', all_users, flush=True)  # Debug statement
             return jsonify({"error": "Username does not exist"}), 400
 
         # Check if the student already exists in the students collection
-        if students_collection.find_one({"username": username}):
+        if reference_exists('student', username):
             return jsonify({"error": "Student already exists"}), 400
 
-        student_doc = {
-            '_id': ObjectId(),
-            'username': username,
-            'class_details': build_class_details(student_data.get('class_details', {})),
-            'enrollment_date': student_data.get('enrollment_date', ''),
-            'education': build_education_section(student_data.get('education', {})),
-            'guardian_info': build_guardian_info(student_data.get('guardian_info', {}))
-        }
+        student_doc = build_student_doc(student_data)
 
         students_collection.insert_one(student_doc)
+        invalidate_response('student', username)
 
         return jsonify({"message": "Student added successfully", "id": str(student_doc['_id'])}), 201
     except Exception as e:
@@ -90,14 +95,30 @@ def add_student():
 @student_blueprint.route('/get_student/<username>', methods=['GET'])
 def get_student(username):
     try:
-        student = students_collection.find_one({"username": username})
-        
-        if student:
-            student['_id'] = str(student['_id'])  # Convert ObjectId to string for JSON serialization
-            return jsonify(student), 200
+        # Served from the response cache; 304 when the client's copy is current
+        entry = cached_document_response(
+            'student', username, lambda: students_collection.find_one({"username": username}), student_json
+        )
+
+        if entry:
+            return conditional_response(entry, request.environ)
         else:
             return jsonify({"error": "Student not found"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@student_blueprint.route('/list_students', methods=['GET'])
+def list_students():
+    try:
+        query = {}
+        for field in ('current_class', 'section'):
+            if request.args.get(field):
+                query[f'class_details.{field}'] = request.args[field]
+
+        page = paginate(students_collection, query, request.args, sort_field='username',
+                        projection=field_projection(request.args))
+        return jsonify(page), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 # Add more routes to handle other student-specific operations if needed.
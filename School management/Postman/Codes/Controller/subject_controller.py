@@ -1,11 +1,10 @@
 from flask import Blueprint, request, jsonify
-from pymongo import MongoClient
+from database import get_collection
 from bson.objectid import ObjectId
+from reference_cache import reference_exists, invalidate_reference
 
 # Configure MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client['School']
-subjects_collection = db['subjects']
+subjects_collection = get_collection('subjects')
 
 # Create a blueprint
 subject_blueprint = Blueprint('subject_blueprint', __name__)
@@ -17,7 +16,7 @@ def add_subject():
         subject_code = subject_data['subject_code']
         
         # Check if the subject already exists in the subjects collection
-        if subjects_collection.find_one({"subject_code": subject_code}):
+        if reference_exists('subject', subject_code):
             return jsonify({"error": "Subject already exists"}), 400
 
         subject_data['_id'] = ObjectId()  # Add an ObjectId to the subject data
@@ -33,10 +32,12 @@ def update_subject(subject_code):
         subject_data = request.json
 
         # Check if the subject exists in the subjects collection
-        if not subjects_collection.find_one({"subject_code": subject_code}):
+        if not reference_exists('subject', subject_code):
             return jsonify({"error": "Subject not found"}), 404
 
         result = subjects_collection.update_one({"subject_code": subject_code}, {"$set": subject_data})
+        # The update may rename the subject code
+        invalidate_reference('subject', subject_code)
 
         if result.matched_count > 0:
             return jsonify({"message": "Subject updated successfully"}), 200
@@ -49,6 +50,7 @@ def update_subject(subject_code):
 def delete_subject(subject_code):
     try:
         result = subjects_collection.delete_one({"subject_code": subject_code})
+        invalidate_reference('subject', subject_code)
 
         if result.deleted_count > 0:
             return jsonify({"message": "Subject deleted successfully"}), 200
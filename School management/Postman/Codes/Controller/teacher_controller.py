@@ -1,25 +1,18 @@
 from flask import Blueprint, request, jsonify
-from pymongo import MongoClient
+from database import get_collection
 from bson.objectid import ObjectId
 from utils import user_exists  # Importing the user_exists function
+from reference_cache import reference_exists, existing_references, invalidate_reference
+from pagination import paginate, field_projection
 from datetime import datetime
 
 # Configure MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client['School']
-users_collection = db['users']
-teachers_collection = db['teachers']
-subjects_collection = db['subjects']
+users_collection = get_collection('users')
+teachers_collection = get_collection('teachers')
 
 # Create a blueprint
 teacher_blueprint = Blueprint('teacher_blueprint', __name__)
 
-def subject_exists(subject_code):
-    return subjects_collection.find_one({"subject_code": subject_code}) is not None
-
-def teacher_exists(username):
-    return teachers_collection.find_one({"username": username}) is not None
-
 def build_experience_section(experience_data):
     return {
         'years_of_experience': experience_data.get('years_of_experience', ''),
@@ -46,12 +39,13 @@ def add_teacher():
             return jsonify({"error": "Username does not exist"}), 400
         
         # Check if the teacher already exists in the teachers collection
-        if teacher_exists(username):
+        if reference_exists('teacher', username):
             return jsonify({"error": "Teacher already exists"}), 400
 
         # Check if all subjects exist in the subjects collection
+        known_subjects = existing_references('subject', subjects)
         for subject in subjects:
-            if not subject_exists(subject):
+            if subject not in known_subjects:
                 return jsonify({"error": f"Subject {subject} does not exist"}), 400
         
         teacher_doc = {
@@ -77,12 +71,13 @@ def update_teacher(username):
         subjects = teacher_data.get('subjects', [])
         
         # Check if the teacher exists in the teachers collection
-        if not teacher_exists(username):
+        if not reference_exists('teacher', username):
             return jsonify({"error": "Teacher not found"}), 404
 
         # Check if all subjects exist in the subjects collection
+        known_subjects = existing_references('subject', subjects)
         for subject in subjects:
-            if not subject_exists(subject):
+            if subject not in known_subjects:
                 return jsonify({"error": f"Subject {subject} does not exist"}), 400
 
         update_doc = {
@@ -108,10 +103,12 @@ def update_teacher(username):
 def delete_teacher(username):
     try:
         # Check if the teacher exists in the teachers collection
-        if not teacher_exists(username):
+        if not reference_exists('teacher', username):
             return jsonify({"error": "Teacher not found"}), 404
 
         result = teachers_collection.delete_one({"username": username})
+        invalidate_reference('teacher', username)
+        invalidate_reference('teacher_user_name', username)
 
         if result.deleted_count > 0:
             return jsonify({"message": "Teacher deleted successfully"}), 200
@@ -119,3 +116,16 @@ def delete_teacher(username):
             return jsonify({"error": "Teacher not found"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@teacher_blueprint.route('/list_teachers', methods=['GET'])
+def list_teachers():
+    try:
+        query = {}
+        if request.args.get('subject'):
+            query['subjects'] = request.args['subject']
+
+        page = paginate(teachers_collection, query, request.args, sort_field='username',
+                        projection=field_projection(request.args))
+        return jsonify(page), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
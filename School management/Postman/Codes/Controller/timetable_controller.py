@@ -1,23 +1,16 @@
 from flask import Blueprint, request, jsonify
-from pymongo import MongoClient
+from database import get_collection
 from bson.objectid import ObjectId
+from reference_cache import reference_exists
+from timetable_index import timetable_index
+from timetable_generator import generate_timetable, save_timetable, TimetableError
 
 # Configure MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client['School']
-classes_collection = db['classes']
-subjects_collection = db['subjects']
-timetable_collection = db['timetable']
+timetable_collection = get_collection('timetable')
 
 # Create a blueprint
 timetable_blueprint = Blueprint('timetable_blueprint', __name__)
 
-def class_exists(class_code):
-    return classes_collection.find_one({"class_code": class_code}) is not None
-
-def subject_exists(subject_code):
-    return subjects_collection.find_one({"subject_code": subject_code}) is not None
-
 def timetable_entry_exists(entry_id):
     return timetable_collection.find_one({"_id": ObjectId(entry_id)}) is not None
 
@@ -29,18 +22,29 @@ def add_timetable_entry():
         subject_code = entry_data['subject_code']
         
         # Check if the class exists in the classes collection
-        if not class_exists(class_code):
+        if not reference_exists('class', class_code):
             return jsonify({"error": "Class not found"}), 404
 
         # Check if the subject exists in the subjects collection
-        if not subject_exists(subject_code):
+        if not reference_exists('subject', subject_code):
             return jsonify({"error": "Subject not found"}), 404
 
         entry_data['_id'] = ObjectId()
 
-        timetable_collection.insert_one(entry_data)
+        # Book the class, teacher and room slots in the in-memory index first
+        clashes = timetable_index.reserve(str(entry_data['_id']), entry_data)
+        if clashes:
+            return jsonify({"error": "Timetable clash", "clashes": clashes}), 409
+
+        try:
+            timetable_collection.insert_one(entry_data)
+        except Exception:
+            timetable_index.remove(str(entry_data['_id']))
+            raise
 
         return jsonify({"message": "Timetable entry added successfully", "id": str(entry_data['_id'])}), 201
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -52,23 +56,34 @@ def update_timetable_entry(entry_id):
         subject_code = entry_data.get('subject_code', None)
         
         # Check if the timetable entry exists in the timetable collection
-        if not timetable_entry_exists(entry_id):
+        existing = timetable_collection.find_one({"_id": ObjectId(entry_id)})
+        if existing is None:
             return jsonify({"error": "Timetable entry not found"}), 404
 
         # Check if the class exists in the classes collection
-        if class_code and not class_exists(class_code):
+        if class_code and not reference_exists('class', class_code):
             return jsonify({"error": "Class not found"}), 404
 
         # Check if the subject exists in the subjects collection
-        if subject_code and not subject_exists(subject_code):
+        if subject_code and not reference_exists('subject', subject_code):
             return jsonify({"error": "Subject not found"}), 404
 
-        result = timetable_collection.update_one({"_id": ObjectId(entry_id)}, {"$set": entry_data})
+        clashes = timetable_index.reserve(entry_id, {**existing, **entry_data}, replaces=entry_id)
+        if clashes:
+            return jsonify({"error": "Timetable clash", "clashes": clashes}), 409
+
+        try:
+            result = timetable_collection.update_one({"_id": ObjectId(entry_id)}, {"$set": entry_data})
+        except Exception:
+            timetable_index.restore(entry_id, existing)
+            raise
 
         if result.matched_count > 0:
             return jsonify({"message": "Timetable entry updated successfully"}), 200
         else:
             return jsonify({"error": "Timetable entry not found"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -80,6 +95,7 @@ def delete_timetable_entry(entry_id):
             return jsonify({"error": "Timetable entry not found"}), 404
 
         result = timetable_collection.delete_one({"_id": ObjectId(entry_id)})
+        timetable_index.remove(entry_id)
 
         if result.deleted_count > 0:
             return jsonify({"message": "Timetable entry deleted successfully"}), 200
@@ -87,3 +103,38 @@ def delete_timetable_entry(entry_id):
             return jsonify({"error": "Timetable entry not found"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@timetable_blueprint.route('/timetable_clashes', methods=['GET'])
+def get_timetable_clashes():
+    try:
+        return jsonify({"clashes": timetable_index.all_clashes()}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@timetable_blueprint.route('/generate_timetable', methods=['POST'])
+def generate_timetable_entries():
+    try:
+        generator_data = request.json
+        class_codes = generator_data.get('classes')
+
+        entries = generate_timetable(
+            generator_data['days'],
+            generator_data['slots'],
+            class_codes=class_codes,
+            requirements=generator_data.get('requirements'),
+            seed=generator_data.get('seed')
+        )
+
+        if generator_data.get('dry_run'):
+            return jsonify({"message": "Timetable generated", "entries": entries}), 200
+
+        if class_codes is None:
+            class_codes = sorted({entry['class_code'] for entry in entries})
+        saved = save_timetable(entries, class_codes)
+        timetable_index.invalidate()
+
+        return jsonify({"message": "Timetable generated and saved", "saved": saved, "entries": entries}), 201
+    except TimetableError as e:
+        return jsonify({"error": str(e)}), 422
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
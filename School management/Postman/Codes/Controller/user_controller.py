@@ -1,13 +1,15 @@
 from flask import Blueprint, request, jsonify
 from utils import validate_user, user_exists  # Importing the functions from utils.py
-from pymongo import MongoClient
-import bcrypt
+from database import get_collection
+from reference_cache import invalidate_reference
+from auth import admin_session, issue_token, verify_token, request_token, SESSION_TOKEN_TTL
+from passwords import hash_password, PasswordPoolBusy
+from pagination import paginate, field_projection
+from response_cache import cached_document_response, conditional_response, invalidate_response
 from datetime import datetime
 
 # Configure MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client['School']
-collection = db['users']
+collection = get_collection('users')
 
 # Create a blueprint
 user_blueprint = Blueprint('user_blueprint', __name__)
@@ -73,6 +75,43 @@ def build_parents_info(parents_data):
         'mothers': build_parent_guardian_info(parents_data.get('mothers'))
     }
 
+def build_user_doc(user_data, hashed_password):
+    return {
+        'username': user_data.get('username'),
+        'password': hashed_password,
+        'role': user_data.get('role', ''),
+        'personal_info': build_personal_info(user_data.get('personal_info')),
+        'parents_info': build_parents_info(user_data.get('parents_info')),
+        'address': {
+            'permanent_address': build_address_section(user_data.get('address', {}).get('permanent_address')),
+            'current_address': build_address_section(user_data.get('address', {}).get('current_address'))
+        },
+        'national_id': user_data.get('national_id', ''),
+        'profile_picture_url': user_data.get('profile_picture_url', ''),
+        'status': user_data.get('status', 'active'),
+        'added_at': datetime.utcnow()
+    }
+
+def authenticate_request(user_data):
+    # Prefer the session token from /login; fall back to username/password
+    token = request_token()
+    if token:
+        session = verify_token(token)
+        if session is None:
+            return None
+        if user_data.get('username', session['username']) != session['username']:
+            return None
+        return session['username']
+    username = user_data.get('username')
+    password = user_data.get('password')
+    if username and password and validate_user(username, password):
+        return username
+    return None
+
+def user_json(user):
+    # The JSON provider encodes the ObjectId and redacts the password hash
+    return jsonify(user).get_data()
+
 @user_blueprint.route('/add_user', methods=['POST'])
 def add_user():
     try:
@@ -82,40 +121,33 @@ def add_user():
         if user_exists(username):
             return jsonify({"error": "Username already exists"}), 400
         
+        # Only an admin can create another admin
+        if user_data.get('role') == 'admin' and admin_session() is None:
+            return jsonify({"error": "Admin session required to create an admin"}), 403
+        
         # Hash the password before storing it
-        hashed_password = bcrypt.hashpw(user_data['password'].encode('utf-8'), bcrypt.gensalt())
+        hashed_password = hash_password(user_data['password'])
         
-        user_doc = {
-            'username': username,
-            'password': hashed_password,
-            'role': user_data.get('role', ''),
-            'personal_info': build_personal_info(user_data.get('personal_info')),
-            'parents_info': build_parents_info(user_data.get('parents_info')),
-            'address': {
-                'permanent_address': build_address_section(user_data.get('address', {}).get('permanent_address')),
-                'current_address': build_address_section(user_data.get('address', {}).get('current_address'))
-            },
-            'national_id': user_data.get('national_id', ''),
-            'profile_picture_url': user_data.get('profile_picture_url', ''),
-            'status': user_data.get('status', 'active'),
-            'added_at': datetime.utcnow()
-        }
+        user_doc = build_user_doc(user_data, hashed_password)
         
         user_id = collection.insert_one(user_doc).inserted_id
         
         return jsonify({"message": "User added successfully", "user_id": str(user_id)}), 201
+    except PasswordPoolBusy as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @user_blueprint.route('/get_user/<username>', methods=['GET'])
 def get_user(username):
     try:
-        user = collection.find_one({"username": username})
-        
-        if user:
-            user['_id'] = str(user['_id'])  # Convert ObjectId to string for JSON serialization
-            user['password'] = user['password'].decode('utf-8')  # Decode bytes to string
-            return jsonify(user), 200
+        # Served from the response cache; 304 when the client's copy is current
+        entry = cached_document_response(
+            'user', username, lambda: collection.find_one({"username": username}), user_json
+        )
+
+        if entry:
+            return conditional_response(entry, request.environ)
         else:
             return jsonify({"error": "User not found"}), 404
     except Exception as e:
@@ -131,12 +163,19 @@ def login():
         user = validate_user(username, password)
         
         if user:
-            user['_id'] = str(user['_id'])  # Convert ObjectId to string for JSON serialization
-            user['password'] = user['password'].decode('utf-8')  # Decode bytes to string
+            token = issue_token(user)
+            del user['password']  # Never hand out the password hash
             
-            return jsonify({"message": "Login successful", "user": user}), 200
+            return jsonify({
+                "message": "Login successful",
+                "token": token,
+                "expires_in": SESSION_TOKEN_TTL,
+                "user": user
+            }), 200
         else:
             return jsonify({"error": "Invalid username or password"}), 401
+    except PasswordPoolBusy as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -144,22 +183,19 @@ def login():
 def update_user():
     try:
         user_data = request.json
-        username = user_data.get('username')
-        password = user_data.get('password')
-        
-        user = validate_user(username, password)
+        username = authenticate_request(user_data)
         
-        if user:
+        if username:
             update_data = {}
             
             # Hash the new password if it's being updated
             if 'new_password' in user_data:
-                hashed_password = bcrypt.hashpw(user_data['new_password'].encode('utf-8'), bcrypt.gensalt())
+                hashed_password = hash_password(user_data['new_password'])
                 update_data['password'] = hashed_password
             
-            # Add other fields to update data
+            # Add other fields to update data; role and status are not self-service
             for field in user_data:
-                if field not in ['username', 'password', 'new_password']:
+                if field.split('.')[0] not in ['username', 'password', 'new_password', 'role', 'status']:
                     if field.startswith('personal_info') or field.startswith('parents_info') or field.startswith('address'):
                         update_data[field] = user_data[field]
                     else:
@@ -169,33 +205,51 @@ def update_user():
             update_data['updated_at'] = datetime.utcnow()
             
             result = collection.update_one({"username": username}, {"$set": update_data})
+            invalidate_response('user', username)
             
             if result.matched_count > 0:
                 return jsonify({"message": "User updated successfully"}), 200
             else:
                 return jsonify({"error": "User not found"}), 404
         else:
-            return jsonify({"error": "Invalid username or password"}), 401
+            return jsonify({"error": "Invalid credentials or session token"}), 401
+    except PasswordPoolBusy as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @user_blueprint.route('/delete_user', methods=['DELETE'])
 def delete_user():
     try:
-        user_data = request.json
-        username = user_data['username']
-        password = user_data['password']
+        user_data = request.get_json(silent=True) or {}
+        username = authenticate_request(user_data)
         
-        user = validate_user(username, password)
-        
-        if user:
+        if username:
             result = collection.delete_one({"username": username})
+            invalidate_reference('user', username)
+            invalidate_response('user', username)
             
             if result.deleted_count > 0:
                 return jsonify({"message": "User deleted successfully"}), 200
             else:
                 return jsonify({"error": "User not found"}), 404
         else:
-            return jsonify({"error": "Invalid username or password"}), 401
+            return jsonify({"error": "Invalid credentials or session token"}), 401
+    except PasswordPoolBusy as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@user_blueprint.route('/list_users', methods=['GET'])
+def list_users():
+    try:
+        query = {}
+        for field in ('role', 'status'):
+            if request.args.get(field):
+                query[field] = request.args[field]
+
+        page = paginate(collection, query, request.args, sort_field='username',
+                        projection=field_projection(request.args), excluded_fields=('password',))
+        return jsonify(page), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
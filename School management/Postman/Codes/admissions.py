@@ -0,0 +1,120 @@
+import csv
+import io
+import json
+import os
+import sys
+from pymongo.errors import BulkWriteError
+from database import get_collection
+from passwords import hash_passwords
+from Controller.user_controller import build_user_doc
+from Controller.student_controller import build_student_doc
+
+IMPORT_BATCH_SIZE = 500
+# Every row costs one bcrypt hash, so an import over HTTP has to finish well
+# inside the worker timeout (WEB_TIMEOUT). Larger files go through the CLI.
+IMPORT_HTTP_ROW_LIMIT = int(os.environ.get('IMPORT_HTTP_ROW_LIMIT', 200))
+
+users_collection = get_collection('users')
+students_collection = get_collection('students')
+
+def unflatten(row):
+    # CSV columns use dotted names (personal_info.name, guardian_info.contact.phone)
+    doc = {}
+    for key, value in row.items():
+        if key is None or value in (None, ''):
+            continue
+        target = doc
+        parts = key.split('.')
+        for part in parts[:-1]:
+            target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    return doc
+
+def parse_rows(content, file_format):
+    if file_format == 'csv':
+        return [unflatten(row) for row in csv.DictReader(io.StringIO(content))]
+    rows = json.loads(content)
+    if not isinstance(rows, list):
+        raise ValueError("JSON import must be a list of admission records")
+    return rows
+
+def insert_batches(collection, docs):
+    # Unordered batched inserts; returns the positions in docs that failed
+    failed = {}
+    for start in range(0, len(docs), IMPORT_BATCH_SIZE):
+        batch = docs[start:start + IMPORT_BATCH_SIZE]
+        try:
+            collection.insert_many(batch, ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get('writeErrors', []):
+                failed[start + write_error['index']] = write_error['errmsg']
+    return failed
+
+def import_admissions(rows):
+    results = [None] * len(rows)
+
+    # Validate shape and in-file duplicates before touching the database
+    candidates = []
+    seen = set()
+    for i, row in enumerate(rows):
+        username = row.get('username')
+        if not username or not row.get('password'):
+            results[i] = {"row": i, "error": "username and password are required"}
+        elif username in seen:
+            results[i] = {"row": i, "username": username, "error": "Duplicate username in import"}
+        else:
+            seen.add(username)
+            candidates.append(i)
+
+    # One $in query per collection for usernames that already exist
+    usernames = [rows[i]['username'] for i in candidates]
+    taken = {doc['username'] for doc in users_collection.find({"username": {"$in": usernames}}, {"username": 1, "_id": 0})}
+    taken |= {doc['username'] for doc in students_collection.find({"username": {"$in": usernames}}, {"username": 1, "_id": 0})}
+    pending = []
+    for i in candidates:
+        if rows[i]['username'] in taken:
+            results[i] = {"row": i, "username": rows[i]['username'], "error": "Username already exists"}
+        else:
+            pending.append(i)
+
+    hashed = hash_passwords([rows[i]['password'] for i in pending])
+    user_docs = []
+    for i, hashed_password in zip(pending, hashed):
+        user_data = {**rows[i], 'role': 'student'}  # A column can't make an admission anything else
+        user_docs.append(build_user_doc(user_data, hashed_password))
+
+    failed_users = insert_batches(users_collection, user_docs)
+    admitted = [i for position, i in enumerate(pending) if position not in failed_users]
+    for position, error in failed_users.items():
+        i = pending[position]
+        results[i] = {"row": i, "username": rows[i]['username'], "error": error}
+
+    student_docs = [build_student_doc(rows[i]) for i in admitted]
+    failed_students = insert_batches(students_collection, student_docs)
+    # Remove the user of every row whose student failed, so the row can be imported again
+    orphaned = [rows[admitted[position]]['username'] for position in failed_students]
+    if orphaned:
+        users_collection.delete_many({"username": {"$in": orphaned}})
+    for position, (i, student_doc) in enumerate(zip(admitted, student_docs)):
+        if position in failed_students:
+            results[i] = {"row": i, "username": rows[i]['username'], "error": failed_students[position]}
+        else:
+            results[i] = {"row": i, "username": rows[i]['username'], "id": str(student_doc['_id'])}
+
+    imported = sum(1 for result in results if 'id' in result)
+    return {
+        "imported": imported,
+        "failed": len(results) - imported,
+        "results": results
+    }
+
+if __name__ == '__main__':
+    # Usage: python admissions.py <file.csv|file.json>
+    if len(sys.argv) != 2:
+        print("Usage: python admissions.py <file.csv|file.json>")
+        sys.exit(1)
+    path = sys.argv[1]
+    with open(path, encoding='utf-8') as f:
+        report = import_admissions(parse_rows(f.read(), 'csv' if path.endswith('.csv') else 'json'))
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report['failed'] == 0 else 1)
@@ -1,4 +1,10 @@
+import atexit
 from flask import Flask
+from database import close_client, configure
+from json_provider import MongoJSONProvider
+from metrics import init_metrics
+from passwords import shutdown_pool
+from slow_queries import init_slow_query_log
 from Controller.user_controller import user_blueprint  # Import the blueprint
 from Controller.student_controller import student_blueprint
 from Controller.teacher_controller import teacher_blueprint
@@ -11,20 +17,46 @@ from Controller.exam_results_controller import exam_results_blueprint
 from Controller.timetable_controller import timetable_blueprint
 from Controller.fees_controller import fees_blueprint
 from Controller.salary_controller import salary_blueprint
+from Controller.export_controller import export_blueprint
+from Controller.admission_controller import admission_blueprint
+from Controller.report_card_controller import report_card_blueprint
+from Controller.admin_controller import admin_blueprint
 
-app = Flask(__name__)
-app.register_blueprint(user_blueprint)  # Register the blueprint
-app.register_blueprint(student_blueprint)
-app.register_blueprint(teacher_blueprint)
-app.register_blueprint(subject_blueprint)
-app.register_blueprint(staff_blueprint)
-app.register_blueprint(class_blueprint)
-app.register_blueprint(attendance_blueprint)
-app.register_blueprint(exam_blueprint)
-app.register_blueprint(exam_results_blueprint)
-app.register_blueprint(timetable_blueprint)
-app.register_blueprint(fees_blueprint)
-app.register_blueprint(salary_blueprint)
+def create_app(config=None):
+    # Settings come from FLASK_* environment variables, then from config.
+    # Building the app opens no connections; each worker process connects
+    # to MongoDB on its first query.
+    app = Flask(__name__)
+    app.json = MongoJSONProvider(app)
+    app.config.from_prefixed_env()
+    if config:
+        app.config.from_mapping(config)
+    if app.config.get('MONGO_SETTINGS'):
+        configure(**app.config['MONGO_SETTINGS'])
+
+    app.register_blueprint(user_blueprint)  # Register the blueprint
+    app.register_blueprint(student_blueprint)
+    app.register_blueprint(teacher_blueprint)
+    app.register_blueprint(subject_blueprint)
+    app.register_blueprint(staff_blueprint)
+    app.register_blueprint(class_blueprint)
+    app.register_blueprint(attendance_blueprint)
+    app.register_blueprint(exam_blueprint)
+    app.register_blueprint(exam_results_blueprint)
+    app.register_blueprint(timetable_blueprint)
+    app.register_blueprint(fees_blueprint)
+    app.register_blueprint(salary_blueprint)
+    app.register_blueprint(export_blueprint)
+    app.register_blueprint(admission_blueprint)
+    app.register_blueprint(report_card_blueprint)
+    app.register_blueprint(admin_blueprint)
+    init_metrics(app)
+    init_slow_query_log()
+    return app
+
+# Close the shared MongoDB client and password pool when the process exits
+atexit.register(close_client)
+atexit.register(shutdown_pool)
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    create_app().run(debug=True)
@@ -0,0 +1,121 @@
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.exceptions import MethodNotAllowed, NotFound
+from werkzeug.routing import Map, Rule
+from app import create_app
+from database import close_async_client, get_async_db
+from response_cache import cached_response, conditional_response, store_response
+from Controller.student_controller import student_json
+from Controller.user_controller import user_json
+
+# Asyncio serving mode, run with an ASGI server:
+#   uvicorn asgi:application --workers 4
+# The read-heavy lookups below are served on the event loop with pymongo's
+# async client, so one process can hold thousands of them in flight. Every
+# other route goes to the unchanged Flask app on asgiref's thread pool.
+
+app = create_app()
+
+async_routes = Map()
+async_views = {}
+
+def async_route(rule):
+    def register(view):
+        async_routes.add(Rule(rule, endpoint=view.__name__, methods=['GET']))
+        async_views[view.__name__] = view
+        return view
+    return register
+
+async def cached_document(kind, key, load, encode):
+    # Same response cache as the sync routes, which also invalidate it
+    entry, generation = cached_response(kind, key)
+    if entry is None:
+        doc = await load()
+        if doc is None:
+            return None
+        with app.app_context():
+            entry = store_response(kind, key, doc, encode(doc), generation)
+    return entry
+
+@async_route('/get_student/<username>')
+async def get_student(environ, username):
+    entry = await cached_document(
+        'student', username, lambda: get_async_db().students.find_one({"username": username}), student_json
+    )
+
+    if entry:
+        return conditional_response(entry, environ)
+    else:
+        return {"error": "Student not found"}, 404
+
+@async_route('/get_user/<username>')
+async def get_user(environ, username):
+    entry = await cached_document(
+        'user', username, lambda: get_async_db().users.find_one({"username": username}), user_json
+    )
+
+    if entry:
+        return conditional_response(entry, environ)
+    else:
+        return {"error": "User not found"}, 404
+
+@async_route('/fee_balance/<student_username>')
+async def get_fee_balance(environ, student_username):
+    balance = await get_async_db().fee_balances.find_one({"student_username": student_username}, {"_id": 0})
+
+    if balance:
+        return balance, 200
+    else:
+        return {"error": "No fee records for student"}, 404
+
+def request_environ(scope):
+    # The WSGI keys conditional responses read (method and headers)
+    environ = {'REQUEST_METHOD': scope['method']}
+    for name, value in scope['headers']:
+        environ['HTTP_' + name.decode('latin-1').upper().replace('-', '_')] = value.decode('latin-1')
+    return environ
+
+async def send_response(send, response, environ):
+    # Werkzeug drops the body and entity headers of 304 and HEAD responses here
+    app_iter, status, headers = response.get_wsgi_response(environ)
+    await send({
+        'type': 'http.response.start',
+        'status': int(status.split(' ', 1)[0]),
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+    })
+    await send({'type': 'http.response.body', 'body': b''.join(app_iter)})
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await close_async_client()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+wsgi_application = WsgiToAsgi(app)
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+
+    if scope['type'] == 'http':
+        try:
+            endpoint, args = async_routes.bind('').match(scope['path'], method=scope['method'])
+        except (NotFound, MethodNotAllowed):
+            pass
+        else:
+            environ = request_environ(scope)
+            try:
+                response = await async_views[endpoint](environ, **args)
+            except Exception as e:
+                response = {"error": str(e)}, 500
+            if isinstance(response, tuple):
+                # Built by the app's JSON provider, so the body matches jsonify exactly
+                payload, status = response
+                response = app.json.response(payload)
+                response.status_code = status
+            return await send_response(send, response, environ)
+
+    await wsgi_application(scope, receive, send)
@@ -0,0 +1,97 @@
+import sys
+from pymongo import ASCENDING, UpdateOne
+from database import get_collection
+
+# Per-user, per-month attendance counts kept in step with the raw
+# attendance collections so reports read a handful of rows.
+ROLLUP_COLLECTION = 'attendance_rollup'
+ROLLUP_STATUSES = ('present', 'absent', 'leave')
+ATTENDANCE_COLLECTIONS = {
+    'student': 'student_attendance',
+    'teacher': 'teacher_attendance',
+    'staff': 'staff_attendance'
+}
+
+rollup_collection = get_collection(ROLLUP_COLLECTION)
+
+def rollup_update(user_type, record, delta):
+    # $inc operation moving one attendance record in (+1) or out (-1) of its month
+    inc = {"total": delta}
+    if record.get('status') in ROLLUP_STATUSES:
+        inc[record['status']] = delta
+    key = {
+        "user_type": user_type,
+        "user_name": record['user_name'],
+        "month": record['date'].strftime("%Y-%m")
+    }
+    return UpdateOne(key, {"$inc": inc}, upsert=True)
+
+def apply_rollup(operations):
+    if operations:
+        rollup_collection.bulk_write(operations, ordered=False)
+
+def record_added(user_type, records):
+    apply_rollup([rollup_update(user_type, record, 1) for record in records])
+
+def record_removed(user_type, record):
+    apply_rollup([rollup_update(user_type, record, -1)])
+
+def record_changed(user_type, before, after):
+    apply_rollup([rollup_update(user_type, before, -1), rollup_update(user_type, after, 1)])
+
+def monthly_rollup(user_type, user_name, from_month=None, to_month=None):
+    query = {"user_type": user_type, "user_name": user_name, "total": {"$gt": 0}}
+    month_filter = {}
+    if from_month:
+        month_filter['$gte'] = from_month
+    if to_month:
+        month_filter['$lte'] = to_month
+    if month_filter:
+        query['month'] = month_filter
+    return list(rollup_collection.find(query, {"_id": 0}).sort("month", ASCENDING))
+
+def rebuild_rollup(user_type):
+    # Regenerate one user type's rollup from its raw attendance records
+    rollup_collection.create_index(
+        [('user_type', ASCENDING), ('user_name', ASCENDING), ('month', ASCENDING)], unique=True
+    )
+    rollup_collection.delete_many({"user_type": user_type})
+    counts = {
+        status: {"$sum": {"$cond": [{"$eq": ["$status", status]}, 1, 0]}}
+        for status in ROLLUP_STATUSES
+    }
+    pipeline = [
+        {"$group": {
+            "_id": {
+                "user_name": "$user_name",
+                "month": {"$dateToString": {"format": "%Y-%m", "date": "$date"}}
+            },
+            "total": {"$sum": 1},
+            **counts
+        }},
+        {"$project": {
+            "_id": 0,
+            "user_type": {"$literal": user_type},
+            "user_name": "$_id.user_name",
+            "month": "$_id.month",
+            "total": 1,
+            **{status: 1 for status in ROLLUP_STATUSES}
+        }},
+        {"$merge": {
+            "into": ROLLUP_COLLECTION,
+            "on": ["user_type", "user_name", "month"],
+            "whenMatched": "replace",
+            "whenNotMatched": "insert"
+        }}
+    ]
+    list(get_collection(ATTENDANCE_COLLECTIONS[user_type]).aggregate(pipeline))
+    return rollup_collection.count_documents({"user_type": user_type})
+
+if __name__ == '__main__':
+    # Usage: python attendance_rollup.py [student|teacher|staff ...]
+    user_types = sys.argv[1:] or list(ATTENDANCE_COLLECTIONS)
+    for user_type in user_types:
+        if user_type not in ATTENDANCE_COLLECTIONS:
+            print(f"Unknown user type: {user_type}")
+            sys.exit(1)
+        print(f"{user_type}: {rebuild_rollup(user_type)} rollup rows")
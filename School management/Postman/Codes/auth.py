@@ -0,0 +1,56 @@
+import hashlib
+import os
+import secrets
+from flask import request
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+from database import get_collection
+
+# Signed, expiring session tokens issued at /login. Set SESSION_SECRET_KEY
+# when running more than one worker so every worker accepts the same tokens.
+# A token carries a marker of the password hash it was issued against, so
+# changing the password (or deleting the user) ends every existing session.
+SESSION_SECRET_KEY = os.environ.get('SESSION_SECRET_KEY') or secrets.token_hex(32)
+SESSION_TOKEN_TTL = int(os.environ.get('SESSION_TOKEN_TTL', 3600))
+
+_serializer = URLSafeTimedSerializer(SESSION_SECRET_KEY, salt='session')
+
+def password_marker(hashed):
+    if isinstance(hashed, str):
+        hashed = hashed.encode('utf-8')
+    return hashlib.sha256(hashed).hexdigest()[:16]
+
+def issue_token(user):
+    # user must still hold its password hash
+    return _serializer.dumps({
+        'username': user['username'],
+        'role': user.get('role', ''),
+        'password': password_marker(user['password'])
+    })
+
+def verify_token(token):
+    # Session payload, with the user's current role, or None when the token is
+    # invalid or expired, the user is gone or the password has changed since
+    try:
+        session = _serializer.loads(token, max_age=SESSION_TOKEN_TTL)
+    except BadSignature:
+        return None
+    user = get_collection('users').find_one({"username": session['username']}, {"password": 1, "role": 1, "_id": 0})
+    if user is None or session.get('password') != password_marker(user.get('password', b'')):
+        return None
+    session['role'] = user.get('role', '')
+    return session
+
+def request_token():
+    header = request.headers.get('Authorization', '')
+    if header.startswith('Bearer '):
+        return header[len('Bearer '):].strip()
+    return None
+
+def admin_session():
+    # Session payload when the request carries a valid token for a user who
+    # is an admin now (verify_token reads the current role)
+    token = request_token()
+    session = verify_token(token) if token else None
+    if session is None or session.get('role') != 'admin':
+        return None
+    return session
@@ -0,0 +1,299 @@
+import argparse
+import http.client
+import json
+import math
+import random
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from urllib.parse import urlsplit
+from pymongo import UpdateOne
+from database import configure, get_collection
+
+# Replays a weighted mix of the example requests in input.json against a
+# running server (python serve.py) or an in-process app, then reports
+# throughput and latency percentiles per endpoint. Fixtures are upserted
+# straight into MongoDB, so point MONGO_URI/MONGO_DB_NAME (or --db) at the
+# same database the server uses, preferably a scratch one.
+#
+#   python benchmark.py --url http://localhost:8000 --concurrency 32 --duration 60
+#   python benchmark.py --in-process --output before.json
+#   python benchmark.py --in-process --compare before.json
+
+DEFAULT_MIX = {
+    'get_student': 30,
+    'get_user': 10,
+    'login': 10,
+    'add_attendance': 20,
+    'add_bulk_attendance': 5,
+    'add_exam_result': 15,
+    'add_fee': 5,
+    'list_students': 3,
+    'report_card': 2,
+}
+
+BENCH_PREFIX = 'bench'
+BENCH_CLASS = 'BENCH101'
+BENCH_PASSWORD = 'bench_password'
+
+def load_payloads(path='input.json'):
+    # input.json is a Postman notes file: a URL line, the request body, then
+    # sometimes the stored document (recognisable by its "_id").
+    payloads = {}
+    decoder = json.JSONDecoder()
+    text = open(path, encoding='utf-8').read()
+    route, position = None, 0
+    while position < len(text):
+        if text[position].isspace():
+            position += 1
+        elif text.startswith('http', position):
+            end = text.find('\n', position)
+            end = len(text) if end == -1 else end
+            route = urlsplit(text[position:end].strip()).path
+            position = end
+        else:
+            value, position = decoder.raw_decode(text, position)
+            if route and route not in payloads and '_id' not in value:
+                payloads[route] = value
+    return payloads
+
+def seed_fixtures(students):
+    # Idempotent upserts so reruns reuse the same users, class and exam
+    from passwords import hash_password
+    from Controller.student_controller import build_student_doc
+    from Controller.user_controller import build_user_doc
+
+    usernames = [f"{BENCH_PREFIX}_student_{i}" for i in range(students)]
+    hashed = hash_password(BENCH_PASSWORD)
+    user_ops, student_ops = [], []
+    for i, username in enumerate(usernames):
+        user_doc = build_user_doc({'username': username, 'role': 'student'}, hashed)
+        user_ops.append(UpdateOne({"username": username}, {"$setOnInsert": user_doc}, upsert=True))
+        student_doc = build_student_doc({'username': username, 'class_details': {'current_class': BENCH_CLASS, 'roll_number': i + 1}})
+        del student_doc['_id']
+        student_ops.append(UpdateOne({"username": username}, {"$setOnInsert": student_doc}, upsert=True))
+    get_collection('users').bulk_write(user_ops, ordered=False)
+    get_collection('students').bulk_write(student_ops, ordered=False)
+
+    get_collection('subjects').update_one(
+        {"subject_code": BENCH_CLASS}, {"$setOnInsert": {"name": "Benchmark subject"}}, upsert=True
+    )
+    get_collection('classes').update_one(
+        {"class_code": BENCH_CLASS}, {"$setOnInsert": {"name": "Benchmark class"}}, upsert=True
+    )
+    exam = get_collection('exams').find_one_and_update(
+        {"class_code": BENCH_CLASS, "description": "Benchmark exam"},
+        {"$setOnInsert": {"subject_code": BENCH_CLASS, "exam_date": datetime(2024, 1, 15)}},
+        upsert=True, return_document=True
+    )
+    return {'students': usernames, 'exam_id': str(exam['_id'])}
+
+def random_date(rng):
+    return (date(2024, 1, 1) + timedelta(days=rng.randrange(365))).strftime("%Y-%m-%d")
+
+def build_request(name, templates, fixtures, rng):
+    # (method, path, body) for one request, based on the input.json example
+    student = rng.choice(fixtures['students'])
+    if name == 'get_student':
+        return 'GET', f"/get_student/{student}", None
+    if name == 'get_user':
+        return 'GET', f"/get_user/{student}", None
+    if name == 'list_students':
+        return 'GET', f"/list_students?current_class={BENCH_CLASS}&limit=50", None
+    if name == 'report_card':
+        return 'GET', f"/report_card/{student}", None
+    if name == 'login':
+        return 'POST', '/login', {**templates['/login'], 'username': student, 'password': BENCH_PASSWORD}
+    if name == 'add_attendance':
+        return 'POST', '/add_attendance', {
+            **templates['/add_attendance'], 'user_name': student, 'user_type': 'student',
+            'date': random_date(rng), 'status': rng.choice(['present', 'present', 'present', 'absent', 'leave'])
+        }
+    if name == 'add_bulk_attendance':
+        records = [
+            {'user_name': username, 'status': rng.choice(['present', 'present', 'absent'])}
+            for username in rng.sample(fixtures['students'], min(30, len(fixtures['students'])))
+        ]
+        return 'POST', '/add_bulk_attendance', {
+            **templates['/add_bulk_attendance'], 'class_code': BENCH_CLASS, 'date': random_date(rng), 'records': records
+        }
+    if name == 'add_exam_result':
+        return 'POST', '/add_exam_result', {
+            **templates['/add_exam_result'], 'student': student, 'exam': fixtures['exam_id'],
+            'score': rng.randint(20, 100)
+        }
+    if name == 'add_fee':
+        return 'POST', '/add_fee', {
+            **templates['/add_fee'], 'student_username': student, 'amount': rng.choice([250, 500, 1000]),
+            'due_date': random_date(rng)
+        }
+    raise ValueError(f"Unknown benchmark endpoint {name}")
+
+class HttpTransport:
+    # One keep-alive connection per worker thread
+    def __init__(self, url):
+        parts = urlsplit(url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(parts.hostname, parts.port, timeout=30)
+
+    def send(self, method, path, body):
+        headers = {}
+        data = None
+        if body is not None:
+            data = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        try:
+            self.connection.request(method, path, data, headers)
+            response = self.connection.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            return 0  # Connection error
+
+class InProcessTransport:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def send(self, method, path, body):
+        return self.client.open(path, method=method, json=body).status_code
+
+def percentile(ordered, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+def summarize(latencies, statuses, elapsed):
+    ordered = sorted(latencies)
+    return {
+        'count': len(ordered),
+        'errors': sum(1 for status in statuses if status == 0 or status >= 500),
+        'statuses': {str(status): statuses.count(status) for status in sorted(set(statuses))},
+        'throughput': round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(sum(ordered) / len(ordered), 3) if ordered else None,
+        'p50_ms': percentile(ordered, 0.50),
+        'p95_ms': percentile(ordered, 0.95),
+        'p99_ms': percentile(ordered, 0.99),
+        'max_ms': ordered[-1] if ordered else None,
+    }
+
+def run_benchmark(make_transport, mix, fixtures, templates, concurrency, duration, requests=None, seed=None):
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    results = {name: ([], []) for name in names}
+    results_lock = threading.Lock()
+    remaining = [requests]
+    deadline = time.monotonic() + duration
+
+    def take():
+        # Stop on the request budget when one is given, otherwise on time
+        if requests is None:
+            return time.monotonic() < deadline
+        with results_lock:
+            if remaining[0] <= 0:
+                return False
+            remaining[0] -= 1
+            return True
+
+    def worker(index):
+        rng = random.Random(None if seed is None else seed + index)
+        transport = make_transport()
+        local = {name: ([], []) for name in names}
+        while take():
+            name = rng.choices(names, weights)[0]
+            method, path, body = build_request(name, templates, fixtures, rng)
+            started = time.perf_counter()
+            status = transport.send(method, path, body)
+            local[name][0].append(round((time.perf_counter() - started) * 1000, 3))
+            local[name][1].append(status)
+        with results_lock:
+            for name, (latencies, statuses) in local.items():
+                results[name][0].extend(latencies)
+                results[name][1].extend(statuses)
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+
+    all_latencies = [latency for latencies, _ in results.values() for latency in latencies]
+    all_statuses = [status for _, statuses in results.values() for status in statuses]
+    return {
+        'elapsed': round(elapsed, 3),
+        'total': summarize(all_latencies, all_statuses, elapsed),
+        'endpoints': {
+            name: summarize(latencies, statuses, elapsed)
+            for name, (latencies, statuses) in results.items() if latencies
+        }
+    }
+
+def print_report(report, baseline=None):
+    print(f"{'endpoint':<22}{'count':>8}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    rows = list(report['endpoints'].items()) + [('TOTAL', report['total'])]
+    for name, stats in rows:
+        line = (f"{name:<22}{stats['count']:>8}{stats['errors']:>8}{stats['throughput']:>10.1f}"
+                f"{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+        previous = (baseline or {}).get('endpoints', {}).get(name) if name != 'TOTAL' else (baseline or {}).get('total')
+        if previous and previous.get('p95_ms'):
+            line += (f"   p95 {100 * (stats['p95_ms'] - previous['p95_ms']) / previous['p95_ms']:+.1f}%"
+                     f"  req/s {100 * (stats['throughput'] - previous['throughput']) / previous['throughput']:+.1f}%")
+        print(line)
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(DEFAULT_MIX)
+    if unknown:
+        raise ValueError(f"Unknown endpoints in mix: {', '.join(sorted(unknown))}")
+    return mix
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay input.json request mixes and report latency")
+    parser.add_argument('--url', default='http://localhost:8000', help="server to benchmark")
+    parser.add_argument('--in-process', action='store_true', help="call the app directly instead of over HTTP")
+    parser.add_argument('--db', help="MongoDB database name (defaults to MONGO_DB_NAME)")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30.0, help="seconds to run")
+    parser.add_argument('--requests', type=int, help="stop after this many requests instead")
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX, help="e.g. get_student=50,login=10")
+    parser.add_argument('--students', type=int, default=200, help="benchmark students to seed")
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--payloads', default='input.json')
+    parser.add_argument('--output', help="write results as JSON")
+    parser.add_argument('--compare', help="earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    if args.db:
+        configure(db_name=args.db)
+    templates = load_payloads(args.payloads)
+    fixtures = seed_fixtures(args.students)
+
+    if args.in_process:
+        from app import create_app
+        app = create_app()
+        make_transport = lambda: InProcessTransport(app)
+    else:
+        make_transport = lambda: HttpTransport(args.url)
+
+    report = run_benchmark(make_transport, args.mix, fixtures, templates,
+                           args.concurrency, args.duration, args.requests, args.seed)
+    report.update({
+        'run_at': datetime.utcnow().isoformat(),
+        'target': 'in-process' if args.in_process else args.url,
+        'concurrency': args.concurrency,
+        'mix': args.mix,
+    })
+
+    baseline = json.load(open(args.compare)) if args.compare else None
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+    sys.exit(1 if report['total']['errors'] else 0)
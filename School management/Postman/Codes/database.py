@@ -0,0 +1,90 @@
+import os
+import threading
+from pymongo import AsyncMongoClient, MongoClient
+
+# Connection settings, overridable through the environment
+MONGO_SETTINGS = {
+    'uri': os.environ.get('MONGO_URI', 'mongodb://localhost:27017/'),
+    'db_name': os.environ.get('MONGO_DB_NAME', 'School'),
+    'max_pool_size': int(os.environ.get('MONGO_MAX_POOL_SIZE', 50)),
+    'min_pool_size': int(os.environ.get('MONGO_MIN_POOL_SIZE', 0)),
+    'connect_timeout_ms': int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 5000)),
+    'server_selection_timeout_ms': int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+    'socket_timeout_ms': int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', 30000)),
+}
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+_async_client = None
+
+def configure(**settings):
+    # Settings only take effect for a client opened after this call
+    unknown = set(settings) - set(MONGO_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown MongoDB settings: {', '.join(sorted(unknown))}")
+    MONGO_SETTINGS.update(settings)
+
+def client_options():
+    return {
+        'maxPoolSize': MONGO_SETTINGS['max_pool_size'],
+        'minPoolSize': MONGO_SETTINGS['min_pool_size'],
+        'connectTimeoutMS': MONGO_SETTINGS['connect_timeout_ms'],
+        'serverSelectionTimeoutMS': MONGO_SETTINGS['server_selection_timeout_ms'],
+        'socketTimeoutMS': MONGO_SETTINGS['socket_timeout_ms'],
+        'connect': False
+    }
+
+def get_client():
+    global _client, _client_pid
+    # MongoClient is not fork-safe: a pre-fork server's workers each open
+    # their own client on first use instead of sharing the parent's
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = MongoClient(MONGO_SETTINGS['uri'], **client_options())
+                _client_pid = os.getpid()
+    return _client
+
+def get_db():
+    return get_client()[MONGO_SETTINGS['db_name']]
+
+def close_client():
+    global _client
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+
+def get_async_client():
+    # Client for the asyncio serving mode (asgi.py). It is only used from the
+    # event loop thread, which it binds to on first use.
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncMongoClient(MONGO_SETTINGS['uri'], **client_options())
+    return _async_client
+
+def get_async_db():
+    return get_async_client()[MONGO_SETTINGS['db_name']]
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+
+class LazyCollection:
+    # Stands in for a pymongo Collection at import time and resolves it
+    # against the shared client on each use, so importing a controller
+    # never opens a connection.
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, attr):
+        return getattr(get_db()[self.name], attr)
+
+    def __repr__(self):
+        return f"LazyCollection({self.name!r})"
+
+def get_collection(name):
+    return LazyCollection(name)
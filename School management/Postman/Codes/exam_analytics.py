@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from database import get_collection
+
+EXAM_STATS_CACHE_SIZE = int(os.environ.get('EXAM_STATS_CACHE_SIZE', 256))
+EXAM_STATS_CACHE_TTL = float(os.environ.get('EXAM_STATS_CACHE_TTL', 60))
+SCORE_BANDS = [0, 40, 50, 60, 70, 80, 90, 100.0001]
+
+exam_results_collection = get_collection('exam_results')
+students_collection = get_collection('students')
+
+# Computed statistics per exam id, as (expires_at, statistics). The result
+# endpoints invalidate an exam whenever one of its results changes; other
+# worker processes recompute it once the TTL expires.
+_cache = OrderedDict()
+_generations = {}
+_lock = threading.Lock()
+
+def invalidate_exam(exam_id):
+    with _lock:
+        _cache.pop(str(exam_id), None)
+        _generations[str(exam_id)] = _generations.get(str(exam_id), 0) + 1
+
+def summarize_scores(scores, grades):
+    # Distribution figures for one group of scores (NumPy arrays)
+    values, counts = np.unique(grades, return_counts=True)
+    band_counts, _ = np.histogram(scores, bins=SCORE_BANDS)
+    return {
+        "count": int(scores.size),
+        "mean": round(float(scores.mean()), 2),
+        "median": round(float(np.median(scores)), 2),
+        "std": round(float(scores.std()), 2),
+        "min": float(scores.min()),
+        "max": float(scores.max()),
+        "grades": {str(value): int(count) for value, count in zip(values, counts) if value},
+        "score_bands": {
+            f"{int(low)}-{int(min(high, 100))}": int(count)
+            for low, high, count in zip(SCORE_BANDS, SCORE_BANDS[1:], band_counts)
+        }
+    }
+
+def rank_scores(scores):
+    # Competition ranks (1, 2, 2, 4) and percentile ranks, all vectorized
+    ascending = np.sort(scores)
+    below = np.searchsorted(ascending, scores, side='left')
+    at_or_below = np.searchsorted(ascending, scores, side='right')
+    ranks = scores.size - at_or_below + 1
+    percentiles = (below + 0.5 * (at_or_below - below)) * 100.0 / scores.size
+    return ranks, percentiles
+
+def compute_exam_statistics(exam_id):
+    results = list(exam_results_collection.find({"exam": exam_id}, {"student": 1, "score": 1, "grade": 1, "_id": 0}))
+    results = [result for result in results if isinstance(result.get('score'), (int, float))]
+    if not results:
+        return None
+
+    students = np.array([result['student'] for result in results])
+    scores = np.array([result['score'] for result in results], dtype=float)
+    grades = np.array([result.get('grade') or '' for result in results])
+
+    classes_by_student = {
+        doc['username']: doc.get('class_details', {}).get('current_class')
+        for doc in students_collection.find(
+            {"username": {"$in": students.tolist()}}, {"username": 1, "class_details.current_class": 1, "_id": 0}
+        )
+    }
+    classes = np.array([classes_by_student.get(student) or 'unassigned' for student in students])
+
+    ranks, percentiles = rank_scores(scores)
+    class_ranks = np.zeros(scores.size, dtype=int)
+    for class_code in np.unique(classes):
+        mask = classes == class_code
+        class_ranks[mask] = rank_scores(scores[mask])[0]
+    order = np.argsort(ranks, kind='stable')
+    statistics = summarize_scores(scores, grades)
+    statistics['exam'] = exam_id
+    statistics['rankings'] = [
+        {
+            "student": str(students[i]),
+            "class": str(classes[i]),
+            "score": float(scores[i]),
+            "rank": int(ranks[i]),
+            "class_rank": int(class_ranks[i]),
+            "percentile": round(float(percentiles[i]), 2)
+        }
+        for i in order
+    ]
+
+    statistics['classes'] = {}
+    for class_code in np.unique(classes):
+        mask = classes == class_code
+        class_summary = summarize_scores(scores[mask], grades[mask])
+        class_summary['top_students'] = students[mask & (class_ranks == 1)].tolist()
+        statistics['classes'][str(class_code)] = class_summary
+    return statistics
+
+def exam_statistics(exam_id):
+    exam_id = str(exam_id)
+    with _lock:
+        cached = _cache.get(exam_id)
+        if cached is not None:
+            if cached[0] >= time.monotonic():
+                _cache.move_to_end(exam_id)
+                return cached[1]
+            del _cache[exam_id]
+        generation = _generations.get(exam_id, 0)
+
+    statistics = compute_exam_statistics(exam_id)
+
+    with _lock:
+        # Skip caching if a result changed while we were computing
+        if statistics is not None and _generations.get(exam_id, 0) == generation:
+            _cache[exam_id] = (time.monotonic() + EXAM_STATS_CACHE_TTL, statistics)
+            while len(_cache) > EXAM_STATS_CACHE_SIZE:
+                _cache.popitem(last=False)
+    return statistics
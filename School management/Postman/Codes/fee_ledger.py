@@ -0,0 +1,67 @@
+import sys
+from pymongo import ASCENDING, UpdateOne
+from database import get_collection
+
+# Per-student fee balance kept in step with the fees collection: total_due
+# is the sum of fee amounts, total_paid the sum of payments against them.
+BALANCES_COLLECTION = 'fee_balances'
+
+fees_collection = get_collection('fees')
+balances_collection = get_collection(BALANCES_COLLECTION)
+
+def balance_update(student_username, due_delta, paid_delta):
+    inc = {"total_due": due_delta, "total_paid": paid_delta, "balance": due_delta - paid_delta}
+    return UpdateOne({"student_username": student_username}, {"$inc": inc}, upsert=True)
+
+def fee_balance_update(fee, sign):
+    return balance_update(fee['student_username'], sign * fee.get('amount', 0), sign * fee.get('paid_amount', 0))
+
+def apply_balances(operations):
+    if operations:
+        balances_collection.bulk_write(operations, ordered=False)
+
+def fee_added(fee):
+    apply_balances([fee_balance_update(fee, 1)])
+
+def fee_removed(fee):
+    apply_balances([fee_balance_update(fee, -1)])
+
+def fee_changed(before, after):
+    apply_balances([fee_balance_update(before, -1), fee_balance_update(after, 1)])
+
+def payment_recorded(student_username, amount):
+    apply_balances([balance_update(student_username, 0, amount)])
+
+def rebuild_balances():
+    # Regenerate every balance from the fee records
+    balances_collection.create_index([('student_username', ASCENDING)], unique=True)
+    balances_collection.delete_many({})
+    pipeline = [
+        {"$group": {
+            "_id": "$student_username",
+            "total_due": {"$sum": {"$ifNull": ["$amount", 0]}},
+            "total_paid": {"$sum": {"$ifNull": ["$paid_amount", 0]}}
+        }},
+        {"$project": {
+            "_id": 0,
+            "student_username": "$_id",
+            "total_due": 1,
+            "total_paid": 1,
+            "balance": {"$subtract": ["$total_due", "$total_paid"]}
+        }},
+        {"$merge": {
+            "into": BALANCES_COLLECTION,
+            "on": "student_username",
+            "whenMatched": "replace",
+            "whenNotMatched": "insert"
+        }}
+    ]
+    list(fees_collection.aggregate(pipeline))
+    return balances_collection.count_documents({})
+
+if __name__ == '__main__':
+    # Usage: python fee_ledger.py
+    if sys.argv[1:]:
+        print("Usage: python fee_ledger.py")
+        sys.exit(1)
+    print(f"{rebuild_balances()} student balances rebuilt")
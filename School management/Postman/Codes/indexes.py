@@ -0,0 +1,149 @@
+import sys
+from pymongo import ASCENDING
+from pymongo.errors import OperationFailure
+from database import get_collection
+
+# Indexes backing the lookups the controllers perform, per collection.
+# Teachers and staff are looked up by 'username' in their own controllers
+# and by 'user_name' from the class, attendance and salary controllers.
+INDEXES = {
+    'users': [
+        {'keys': [('username', ASCENDING)], 'unique': True},
+        {'keys': [('role', ASCENDING), ('username', ASCENDING)]},
+    ],
+    'students': [
+        {'keys': [('username', ASCENDING)], 'unique': True},
+        {'keys': [('class_details.current_class', ASCENDING), ('username', ASCENDING)]},
+    ],
+    'teachers': [
+        {'keys': [('username', ASCENDING)], 'unique': True},
+        {'keys': [('user_name', ASCENDING)]},
+        {'keys': [('subjects', ASCENDING), ('username', ASCENDING)]},
+    ],
+    'staff': [
+        {'keys': [('username', ASCENDING)], 'unique': True},
+        {'keys': [('user_name', ASCENDING)]},
+    ],
+    'subjects': [
+        {'keys': [('subject_code', ASCENDING)], 'unique': True},
+    ],
+    'classes': [
+        {'keys': [('class_code', ASCENDING)], 'unique': True},
+    ],
+    'student_attendance': [
+        {'keys': [('user_name', ASCENDING), ('date', ASCENDING)], 'unique': True},
+        {'keys': [('class_code', ASCENDING), ('date', ASCENDING)]},
+    ],
+    'teacher_attendance': [
+        {'keys': [('user_name', ASCENDING), ('date', ASCENDING)], 'unique': True},
+    ],
+    'staff_attendance': [
+        {'keys': [('user_name', ASCENDING), ('date', ASCENDING)], 'unique': True},
+    ],
+    'attendance_rollup': [
+        {'keys': [('user_type', ASCENDING), ('user_name', ASCENDING), ('month', ASCENDING)], 'unique': True},
+        {'keys': [('user_name', ASCENDING), ('month', ASCENDING)]},
+    ],
+    'exams': [
+        {'keys': [('class_code', ASCENDING), ('subject_code', ASCENDING)]},
+    ],
+    'exam_results': [
+        {'keys': [('exam', ASCENDING), ('student', ASCENDING)]},
+        {'keys': [('student', ASCENDING)]},
+    ],
+    'timetable': [
+        {'keys': [('class_code', ASCENDING), ('day_of_week', ASCENDING)]},
+    ],
+    'fees': [
+        {'keys': [('student_username', ASCENDING), ('due_date', ASCENDING)]},
+        {'keys': [('status', ASCENDING), ('due_date', ASCENDING)]},
+    ],
+    'fee_payments': [
+        {'keys': [('fee_id', ASCENDING)]},
+        {'keys': [('student_username', ASCENDING), ('payment_date', ASCENDING)]},
+    ],
+    'fee_balances': [
+        {'keys': [('student_username', ASCENDING)], 'unique': True},
+        {'keys': [('balance', ASCENDING)]},
+    ],
+    'teacher_salaries': [
+        {'keys': [('user_name', ASCENDING), ('payment_date', ASCENDING)]},
+        {'keys': [('user_name', ASCENDING), ('payroll_month', ASCENDING)], 'unique': True,
+         'partial': {'payroll_month': {'$exists': True}}},
+    ],
+    'staff_salaries': [
+        {'keys': [('user_name', ASCENDING), ('payment_date', ASCENDING)]},
+        {'keys': [('user_name', ASCENDING), ('payroll_month', ASCENDING)], 'unique': True,
+         'partial': {'payroll_month': {'$exists': True}}},
+    ],
+    'salary_structures': [
+        {'keys': [('user_type', ASCENDING), ('user_name', ASCENDING)], 'unique': True},
+    ],
+    'slow_query_plans': [
+        {'keys': [('shape_key', ASCENDING)], 'unique': True},
+    ],
+}
+
+def index_name(keys):
+    return '_'.join(f"{field}_{direction}" for field, direction in keys)
+
+def index_status(existing, spec):
+    # Compare a declared index against the collection's index_information()
+    for name, info in existing.items():
+        if info['key'] == spec['keys']:
+            if bool(info.get('unique', False)) != spec.get('unique', False):
+                return 'conflict', f"index {name} exists with unique={bool(info.get('unique', False))}"
+            if info.get('partialFilterExpression') != spec.get('partial'):
+                return 'conflict', f"index {name} exists with a different partial filter"
+            return 'present', None
+    return 'missing', None
+
+def check_indexes():
+    report = []
+    for collection_name, specs in INDEXES.items():
+        existing = get_collection(collection_name).index_information()
+        for spec in specs:
+            status, detail = index_status(existing, spec)
+            report.append({
+                'collection': collection_name,
+                'index': index_name(spec['keys']),
+                'status': status,
+                'detail': detail
+            })
+    return report
+
+def ensure_indexes():
+    report = []
+    for entry in check_indexes():
+        if entry['status'] == 'missing':
+            spec = next(s for s in INDEXES[entry['collection']] if index_name(s['keys']) == entry['index'])
+            try:
+                options = {'name': entry['index'], 'unique': spec.get('unique', False)}
+                if 'partial' in spec:
+                    options['partialFilterExpression'] = spec['partial']
+                get_collection(entry['collection']).create_index(spec['keys'], **options)
+                entry['status'] = 'created'
+            except OperationFailure as e:
+                # Duplicate values or a clashing index definition
+                entry['status'] = 'conflict'
+                entry['detail'] = str(e)
+        report.append(entry)
+    return report
+
+def print_report(report):
+    for entry in report:
+        line = f"{entry['collection']:<20} {entry['index']:<40} {entry['status']}"
+        if entry['detail']:
+            line += f" ({entry['detail']})"
+        print(line)
+
+if __name__ == '__main__':
+    # Usage: python indexes.py [--check]
+    if '--check' in sys.argv[1:]:
+        report = check_indexes()
+        failed = [e for e in report if e['status'] != 'present']
+    else:
+        report = ensure_indexes()
+        failed = [e for e in report if e['status'] == 'conflict']
+    print_report(report)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,48 @@
+import decimal
+import orjson
+from bson.decimal128 import Decimal128
+from bson.objectid import ObjectId
+from flask.json.provider import JSONProvider
+
+def mongo_default(value):
+    # Types orjson doesn't know. Datetimes never get here: orjson writes
+    # them itself as ISO 8601, naive ones (as stored by MongoDB) marked UTC.
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, Decimal128):
+        return str(value.to_decimal())
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return None  # Password hashes and other binary fields never leave the server
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(obj):
+    # Compact JSON for streamed output (exports, report cards), encoded the
+    # same way as the provider's responses
+    option = orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+    return orjson.dumps(obj, default=mongo_default, option=option).decode('utf-8')
+
+class MongoJSONProvider(JSONProvider):
+    # orjson-backed provider so handlers can jsonify raw MongoDB documents
+    sort_keys = True
+
+    def options(self):
+        option = orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self._app.debug:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=kwargs.get('default', mongo_default), option=self.options()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        # Encode straight to bytes instead of going through a str
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=mongo_default, option=self.options()) + b"\n"
+        return self._app.response_class(body, mimetype='application/json')
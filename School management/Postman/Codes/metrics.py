@@ -0,0 +1,102 @@
+import os
+import time
+from flask import Response, g, has_request_context, request
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest
+from prometheus_client import multiprocess
+from pymongo import monitoring
+
+# Under the pre-fork server set PROMETHEUS_MULTIPROC_DIR so /metrics adds up
+# every worker rather than reporting whichever one answered.
+MULTIPROCESS = bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency by route',
+    ['blueprint', 'route', 'method', 'status']
+)
+MONGO_COMMANDS = Counter(
+    'mongo_commands_total', 'MongoDB commands sent, by route and command',
+    ['route', 'command']
+)
+MONGO_COMMAND_FAILURES = Counter(
+    'mongo_command_failures_total', 'MongoDB commands that failed, by route and command',
+    ['route', 'command']
+)
+MONGO_COMMAND_LATENCY = Histogram(
+    'mongo_command_duration_seconds', 'MongoDB command round-trip time',
+    ['command'], buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5)
+)
+MONGO_COMMANDS_PER_REQUEST = Histogram(
+    'mongo_commands_per_request', 'MongoDB round trips made by one request',
+    ['route'], buckets=(0, 1, 2, 3, 4, 6, 8, 12, 20, 50, 100)
+)
+MONGO_TIME_PER_REQUEST = Histogram(
+    'mongo_time_per_request_seconds', 'Time one request spent waiting on MongoDB',
+    ['route']
+)
+
+def current_route():
+    if has_request_context() and request.url_rule is not None:
+        return request.url_rule.rule
+    return 'none'
+
+class CommandMetrics(monitoring.CommandListener):
+    # Events are published on the thread running the operation, so inside a
+    # request they can be charged to it through flask.g
+    def started(self, event):
+        route = current_route()
+        MONGO_COMMANDS.labels(route, event.command_name).inc()
+        if has_request_context():
+            g.mongo_commands = g.get('mongo_commands', 0) + 1
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        MONGO_COMMAND_FAILURES.labels(current_route(), event.command_name).inc()
+        self._finished(event)
+
+    def _finished(self, event):
+        seconds = event.duration_micros / 1e6
+        MONGO_COMMAND_LATENCY.labels(event.command_name).observe(seconds)
+        if has_request_context():
+            g.mongo_seconds = g.get('mongo_seconds', 0.0) + seconds
+
+_listener = None
+
+def init_metrics(app):
+    global _listener
+    # The listener must be registered before the first MongoClient is built;
+    # create_app runs before any worker has connected.
+    if _listener is None:
+        _listener = CommandMetrics()
+        monitoring.register(_listener)
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.get('request_started')
+        if started is not None:
+            route = current_route()
+            REQUEST_LATENCY.labels(
+                request.blueprint or 'app', route, request.method, str(response.status_code)
+            ).observe(time.perf_counter() - started)
+            MONGO_COMMANDS_PER_REQUEST.labels(route).observe(g.get('mongo_commands', 0))
+            MONGO_TIME_PER_REQUEST.labels(route).observe(g.get('mongo_seconds', 0.0))
+        return response
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        if MULTIPROCESS:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+def worker_exit(server, worker):
+    # gunicorn child_exit hook: drop the dead worker's live gauges
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,42 @@
+from bson.objectid import ObjectId
+from pymongo import ASCENDING
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def page_size(args):
+    limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def field_projection(args):
+    # ?fields=a,b,c limits the returned fields; the sort key is always added by paginate
+    fields = [field.strip() for field in args.get('fields', '').split(',') if field.strip()]
+    return {field: 1 for field in fields} or None
+
+def paginate(collection, query, args, sort_field='_id', projection=None, excluded_fields=()):
+    # Keyset pagination: each page starts after the last sort key of the previous
+    # one, so deep pages cost the same as the first as long as sort_field is indexed.
+    query = dict(query)
+    after = args.get('after')
+    if after:
+        query[sort_field] = {"$gt": ObjectId(after) if sort_field == '_id' else after}
+
+    if projection is not None:
+        projection = {**projection, sort_field: 1}
+    elif excluded_fields:
+        projection = {field: 0 for field in excluded_fields}
+
+    limit = page_size(args)
+    cursor = collection.find(query, projection).sort(sort_field, ASCENDING).limit(limit)
+
+    items = []
+    for doc in cursor:
+        for field in excluded_fields:
+            doc.pop(field, None)
+        items.append(doc)
+
+    next_after = None
+    if len(items) == limit:
+        next_after = str(items[-1][sort_field])
+
+    return {"items": items, "next_after": next_after}
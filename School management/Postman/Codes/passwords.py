@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import bcrypt
+
+# bcrypt runs in a small process pool so login storms don't pin request threads
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))
+PASSWORD_POOL_WORKERS = int(os.environ.get('PASSWORD_POOL_WORKERS', os.cpu_count() or 1))
+PASSWORD_QUEUE_LIMIT = int(os.environ.get('PASSWORD_QUEUE_LIMIT', 64))
+PASSWORD_TIMEOUT = float(os.environ.get('PASSWORD_TIMEOUT', 10))
+
+class PasswordPoolBusy(Exception):
+    pass
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(PASSWORD_QUEUE_LIMIT)
+
+def _hashpw(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+def _checkpw(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+def get_pool():
+    global _pool, _pool_pid
+    # A pool inherited across fork is unusable, so each process builds its own
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ProcessPoolExecutor(
+                    max_workers=PASSWORD_POOL_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                _pool_pid = os.getpid()
+    return _pool
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+def _run(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise PasswordPoolBusy("Too many password operations queued")
+    try:
+        future = get_pool().submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=PASSWORD_TIMEOUT)
+    except TimeoutError:
+        raise PasswordPoolBusy("Password operation timed out")
+    except BrokenProcessPool:
+        # A worker died; drop the pool so the next call starts a fresh one
+        shutdown_pool()
+        raise
+
+def hash_password(password):
+    return _run(_hashpw, password.encode('utf-8'), BCRYPT_ROUNDS)
+
+def check_password(password, hashed):
+    return _run(_checkpw, password.encode('utf-8'), hashed)
+
+def hash_passwords(passwords):
+    # Bulk imports spread a whole batch across every pool worker; this bypasses
+    # the per-request queue limit, so keep it to admin and CLI paths
+    encoded = [password.encode('utf-8') for password in passwords]
+    chunksize = max(1, len(encoded) // (PASSWORD_POOL_WORKERS * 4))
+    try:
+        return list(get_pool().map(_hashpw, encoded, [BCRYPT_ROUNDS] * len(encoded), chunksize=chunksize))
+    except BrokenProcessPool:
+        shutdown_pool()
+        raise
+
+def needs_rehash(hashed):
+    # bcrypt hashes look like $2b$<cost>$<salt+hash>
+    try:
+        return int(hashed.split(b'$')[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
@@ -0,0 +1,78 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from database import get_collection
+
+# Lookups used to validate foreign keys, as kind -> (collection, field).
+# Teachers and staff are referenced by 'username' from their own
+# controllers and by 'user_name' from classes, attendance and salaries.
+REFERENCES = {
+    'user': ('users', 'username'),
+    'student': ('students', 'username'),
+    'teacher': ('teachers', 'username'),
+    'teacher_user_name': ('teachers', 'user_name'),
+    'staff': ('staff', 'username'),
+    'staff_user_name': ('staff', 'user_name'),
+    'class': ('classes', 'class_code'),
+    'subject': ('subjects', 'subject_code'),
+}
+
+REFERENCE_CACHE_SIZE = int(os.environ.get('REFERENCE_CACHE_SIZE', 10000))
+REFERENCE_CACHE_TTL = float(os.environ.get('REFERENCE_CACHE_TTL', 300))
+
+# Only references known to exist are cached: a miss always goes to MongoDB,
+# so newly added records are never hidden. Deletes and key-changing
+# updates must call invalidate_reference; other worker processes pick up
+# the change once the TTL expires.
+_known = OrderedDict()
+_lock = threading.Lock()
+
+def _cached(key):
+    with _lock:
+        expires_at = _known.get(key)
+        if expires_at is None:
+            return False
+        if expires_at < time.monotonic():
+            del _known[key]
+            return False
+        _known.move_to_end(key)
+        return True
+
+def _remember(key):
+    with _lock:
+        _known[key] = time.monotonic() + REFERENCE_CACHE_TTL
+        _known.move_to_end(key)
+        while len(_known) > REFERENCE_CACHE_SIZE:
+            _known.popitem(last=False)
+
+def reference_exists(kind, value):
+    key = (kind, value)
+    if _cached(key):
+        return True
+    collection_name, field = REFERENCES[kind]
+    if get_collection(collection_name).find_one({field: value}, {"_id": 1}) is None:
+        return False
+    _remember(key)
+    return True
+
+def existing_references(kind, values):
+    # Resolve many values at once; only the uncached ones hit MongoDB, in one $in query
+    values = {value for value in values if value}
+    found = {value for value in values if _cached((kind, value))}
+    missing = values - found
+    if missing:
+        collection_name, field = REFERENCES[kind]
+        cursor = get_collection(collection_name).find({field: {"$in": list(missing)}}, {field: 1, "_id": 0})
+        for doc in cursor:
+            found.add(doc[field])
+            _remember((kind, doc[field]))
+    return found
+
+def invalidate_reference(kind, value):
+    with _lock:
+        _known.pop((kind, value), None)
+
+def clear_references():
+    with _lock:
+        _known.clear()
@@ -0,0 +1,136 @@
+import sys
+from datetime import datetime
+from bson.objectid import ObjectId
+from jinja2 import Environment
+from database import get_collection
+from json_provider import dumps
+
+students_collection = get_collection('students')
+exams_collection = get_collection('exams')
+
+REPORT_CARD_TEMPLATE = Environment(autoescape=True).from_string("""
+<section class="report-card">
+  <h2>{{ card.name or card.username }}</h2>
+  <p>Class {{ card.class_details.current_class or '' }}, roll number {{ card.class_details.roll_number or '' }}</p>
+  <table>
+    <tr><th>Subject</th><th>Exam</th><th>Date</th><th>Score</th><th>Grade</th></tr>
+    {% for exam in card.exams %}
+    <tr><td>{{ exam.subject_code }}</td><td>{{ exam.description }}</td><td>{{ exam.exam_date }}</td>
+        <td>{{ exam.score }}</td><td>{{ exam.grade }}</td></tr>
+    {% endfor %}
+  </table>
+  <p>Average score: {{ card.average_score if card.average_score is not none else '-' }}</p>
+  <p>Attendance: {{ card.attendance.present }}/{{ card.attendance.total }} days ({{ card.attendance.percentage }}%)</p>
+</section>
+""")
+
+def report_card_pipeline(match, from_month=None, to_month=None):
+    # Students joined with their user profile, exam results and monthly
+    # attendance rollup in a single aggregation
+    month_conditions = [{"$eq": ["$$row.user_type", "student"]}]
+    if from_month:
+        month_conditions.append({"$gte": ["$$row.month", from_month]})
+    if to_month:
+        month_conditions.append({"$lte": ["$$row.month", to_month]})
+    return [
+        {"$match": match},
+        {"$sort": {"class_details.roll_number": 1, "username": 1}},
+        {"$lookup": {"from": "users", "localField": "username", "foreignField": "username", "as": "user"}},
+        {"$lookup": {"from": "exam_results", "localField": "username", "foreignField": "student", "as": "results"}},
+        {"$lookup": {"from": "attendance_rollup", "localField": "username", "foreignField": "user_name", "as": "attendance"}},
+        {"$project": {
+            "_id": 0,
+            "username": 1,
+            "class_details": 1,
+            "guardian_info": 1,
+            "name": {"$arrayElemAt": ["$user.personal_info.name", 0]},
+            "results": {"$map": {"input": "$results", "as": "result", "in": {
+                "exam": "$$result.exam", "score": "$$result.score", "grade": "$$result.grade"
+            }}},
+            "attendance": {"$filter": {"input": "$attendance", "as": "row", "cond": {"$and": month_conditions}}}
+        }}
+    ]
+
+def load_exams(students, from_date=None, to_date=None):
+    # One query for every exam referenced by the batch
+    exam_ids = {result['exam'] for student in students for result in student['results']}
+    query = {"_id": {"$in": [ObjectId(exam_id) for exam_id in exam_ids if ObjectId.is_valid(exam_id)]}}
+    date_filter = {}
+    if from_date:
+        date_filter['$gte'] = from_date
+    if to_date:
+        date_filter['$lte'] = to_date
+    if date_filter:
+        query['exam_date'] = date_filter
+    return {str(exam['_id']): exam for exam in exams_collection.find(query)}
+
+def build_report_card(student, exams):
+    card_exams = []
+    for result in student['results']:
+        exam = exams.get(result['exam'])
+        if exam is None:
+            continue
+        card_exams.append({
+            'exam_id': result['exam'],
+            'subject_code': exam.get('subject_code', ''),
+            'description': exam.get('description', ''),
+            'exam_date': exam['exam_date'].strftime("%Y-%m-%d") if isinstance(exam.get('exam_date'), datetime) else '',
+            'score': result.get('score'),
+            'grade': result.get('grade', '')
+        })
+    card_exams.sort(key=lambda exam: (exam['exam_date'], exam['subject_code']))
+
+    scores = [exam['score'] for exam in card_exams if isinstance(exam['score'], (int, float))]
+    attendance = {
+        status: sum(row.get(status, 0) for row in student['attendance'])
+        for status in ('total', 'present', 'absent', 'leave')
+    }
+    attendance['percentage'] = round(attendance['present'] * 100 / attendance['total'], 2) if attendance['total'] else 0.0
+
+    return {
+        'username': student['username'],
+        'name': student.get('name', ''),
+        'class_details': student.get('class_details', {}),
+        'guardian_info': student.get('guardian_info', {}),
+        'exams': card_exams,
+        'average_score': round(sum(scores) / len(scores), 2) if scores else None,
+        'attendance': attendance
+    }
+
+def assemble_report_cards(match, from_date=None, to_date=None):
+    from_month = from_date.strftime("%Y-%m") if from_date else None
+    to_month = to_date.strftime("%Y-%m") if to_date else None
+    students = list(students_collection.aggregate(report_card_pipeline(match, from_month, to_month)))
+    exams = load_exams(students, from_date, to_date)
+    return students, exams
+
+def render_json(card):
+    return dumps(card)
+
+def render_html(card):
+    return REPORT_CARD_TEMPLATE.render(card=card)
+
+def stream_report_cards(students, exams, output_format='json'):
+    # Cards are built and rendered one at a time and yielded in roll order,
+    # so the first card goes out before the last one is rendered
+    render = render_html if output_format == 'html' else render_json
+    rendered = (render(build_report_card(student, exams)) for student in students)
+    if output_format == 'html':
+        yield '<!DOCTYPE html>\n<html><body>\n'
+        yield from rendered
+        yield '</body></html>\n'
+    else:
+        yield '['
+        for i, card in enumerate(rendered):
+            yield (',' if i else '') + card
+        yield ']\n'
+
+if __name__ == '__main__':
+    # Usage: python report_cards.py <class_code> [json|html] > cards.out
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python report_cards.py <class_code> [json|html]")
+        sys.exit(1)
+    output_format = sys.argv[2] if len(sys.argv) == 3 else 'json'
+    students, exams = assemble_report_cards({"class_details.current_class": sys.argv[1]})
+    for chunk in stream_report_cards(students, exams, output_format):
+        sys.stdout.write(chunk)
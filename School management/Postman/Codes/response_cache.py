@@ -0,0 +1,96 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from werkzeug.wrappers import Response
+
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 5000))
+RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 30))
+
+# Encoded JSON bodies of single-document reads, keyed by (kind, key), with
+# the ETag and Last-Modified to answer conditional requests. Only found
+# documents are cached. Writes in this process call invalidate_response;
+# other worker processes serve their copy until the TTL expires.
+_responses = OrderedDict()
+_generations = {}
+_lock = threading.Lock()
+
+class CachedResponse:
+    __slots__ = ('body', 'etag', 'last_modified', 'expires_at')
+
+    def __init__(self, body, etag, last_modified):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = time.monotonic() + RESPONSE_CACHE_TTL
+
+def last_modified(doc):
+    # updated_at when the document has been changed, else when it was added
+    value = doc.get('updated_at') or doc.get('added_at')
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return None
+
+def _cached(key):
+    # Returns (entry, generation); the generation must be passed back when
+    # storing so a write that lands while the document is loading wins
+    with _lock:
+        entry = _responses.get(key)
+        generation = _generations.get(key, 0)
+        if entry is None:
+            return None, generation
+        if entry.expires_at < time.monotonic():
+            del _responses[key]
+            return None, generation
+        _responses.move_to_end(key)
+        return entry, generation
+
+def _remember(key, entry, generation):
+    with _lock:
+        if _generations.get(key, 0) != generation:
+            return
+        _responses[key] = entry
+        _responses.move_to_end(key)
+        while len(_responses) > RESPONSE_CACHE_SIZE:
+            _responses.popitem(last=False)
+
+def cached_response(kind, key):
+    return _cached((kind, key))
+
+def store_response(kind, key, doc, body, generation):
+    # The ETag covers the body itself, so changes that don't touch
+    # updated_at (a password rehash, say) still produce a new one
+    entry = CachedResponse(body, hashlib.sha1(body).hexdigest(), last_modified(doc))
+    _remember((kind, key), entry, generation)
+    return entry
+
+def cached_document_response(kind, key, load, encode):
+    # The entry for (kind, key), calling load() for the document and
+    # encode(doc) for its JSON body on a miss; None when there is no document
+    entry, generation = cached_response(kind, key)
+    if entry is None:
+        doc = load()
+        if doc is None:
+            return None
+        entry = store_response(kind, key, doc, encode(doc), generation)
+    return entry
+
+def conditional_response(entry, environ):
+    # 200 with validators, or 304 when If-None-Match/If-Modified-Since match
+    response = Response(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    if entry.last_modified is not None:
+        response.last_modified = entry.last_modified
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(environ)
+
+def invalidate_response(kind, key):
+    with _lock:
+        _responses.pop((kind, key), None)
+        _generations[(kind, key)] = _generations.get((kind, key), 0) + 1
+
+def clear_responses():
+    with _lock:
+        _responses.clear()
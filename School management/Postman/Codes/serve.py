@@ -0,0 +1,50 @@
+import multiprocessing
+import os
+import sys
+from gunicorn.app.base import BaseApplication
+import passwords
+from app import create_app
+from metrics import worker_exit
+
+# Production server settings, overridable through the environment. The app is
+# built once in the master and forked into the workers, so a worker starts
+# without re-importing anything; MongoDB clients and the password pool are
+# created per process after the fork.
+SERVER_SETTINGS = {
+    'bind': os.environ.get('WEB_BIND', '0.0.0.0:8000'),
+    'workers': int(os.environ.get('WEB_WORKERS', multiprocessing.cpu_count() * 2 + 1)),
+    'threads': int(os.environ.get('WEB_THREADS', 4)),
+    'timeout': int(os.environ.get('WEB_TIMEOUT', 60)),
+    'max_requests': int(os.environ.get('WEB_MAX_REQUESTS', 0)),
+    'max_requests_jitter': int(os.environ.get('WEB_MAX_REQUESTS_JITTER', 0)),
+    'preload_app': True,
+    'child_exit': worker_exit,
+}
+
+# Every worker starts its own bcrypt pool of PASSWORD_POOL_WORKERS processes,
+# so the passwords.py default of one per CPU would give workers * CPUs
+# processes. Unless set explicitly, split the CPUs between the workers.
+if 'PASSWORD_POOL_WORKERS' not in os.environ:
+    passwords.PASSWORD_POOL_WORKERS = max(1, multiprocessing.cpu_count() // SERVER_SETTINGS['workers'])
+
+class SchoolServer(BaseApplication):
+    def __init__(self, application, settings):
+        self.application = application
+        self.settings = settings
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.settings.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        return self.application
+
+if __name__ == '__main__':
+    # Usage: python serve.py [bind]
+    if len(sys.argv) > 2:
+        print("Usage: python serve.py [bind]")
+        sys.exit(1)
+    if len(sys.argv) == 2:
+        SERVER_SETTINGS['bind'] = sys.argv[1]
+    SchoolServer(create_app(), SERVER_SETTINGS).run()
@@ -0,0 +1,223 @@
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pymongo import monitoring
+from pymongo.errors import CollectionInvalid
+from database import get_client, get_collection, get_db
+from metrics import current_route
+
+# Commands slower than SLOW_QUERY_MS are written to a capped collection (and
+# to SLOW_QUERY_LOG_FILE as JSON lines when set). The first time a query
+# shape is seen its explain plan is stored in slow_query_plans. Set
+# SLOW_QUERY_MS=0 to turn the hook off.
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+SLOW_QUERY_LOG_SIZE = int(os.environ.get('SLOW_QUERY_LOG_SIZE', 16 * 1024 * 1024))
+SLOW_QUERY_LOG_FILE = os.environ.get('SLOW_QUERY_LOG_FILE')
+SLOW_QUERY_QUEUE_LIMIT = 1000
+
+SLOW_QUERIES_COLLECTION = 'slow_queries'
+PLANS_COLLECTION = 'slow_query_plans'
+
+# Command name -> field holding its filter. Other commands are not tracked.
+EXPLAINABLE = {
+    'find': 'filter',
+    'count': 'query',
+    'distinct': 'query',
+    'findAndModify': 'query',
+    'aggregate': 'pipeline',
+    'update': 'updates',
+    'delete': 'deletes',
+}
+# Session and transport fields the explain command does not accept
+UNEXPLAINABLE_FIELDS = {'lsid', 'txnNumber', 'writeConcern', 'readConcern', 'autocommit', 'startTransaction'}
+
+slow_queries_collection = get_collection(SLOW_QUERIES_COLLECTION)
+plans_collection = get_collection(PLANS_COLLECTION)
+
+logger = logging.getLogger('slow_queries')
+
+def redact(value):
+    # Keep field names and operators; every value becomes its type name and
+    # lists of plain values ($in and friends) collapse to a single entry
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, list):
+        shapes = [redact(item) for item in value]
+        if all(not isinstance(item, (dict, list)) for item in value):
+            return sorted(set(shapes))
+        return shapes
+    return type(value).__name__
+
+def query_shape(command_name, command):
+    target = command.get(EXPLAINABLE[command_name])
+    if command_name in ('update', 'delete'):
+        # Statements of one bulk write share a shape; describe the first
+        target = target[0].get('q', {}) if target else {}
+    return redact(target or {})
+
+def explain_command(command_name, command):
+    explained = {
+        key: value for key, value in command.items()
+        if not key.startswith('$') and key not in UNEXPLAINABLE_FIELDS
+    }
+    return {'explain': explained, 'verbosity': 'queryPlanner'}
+
+def plan_summary(explain):
+    # Stage and index names found anywhere in the plan, whatever the command
+    stages, indexes = [], []
+    def walk(node):
+        if isinstance(node, dict):
+            if isinstance(node.get('stage'), str):
+                stages.append(node['stage'])
+            if isinstance(node.get('indexName'), str):
+                indexes.append(node['indexName'])
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+    walk(explain.get('queryPlanner', explain))
+    return {'stages': stages, 'indexes': sorted(set(indexes)), 'collection_scan': 'COLLSCAN' in stages}
+
+_explained = set()
+_pending = {}
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(SLOW_QUERY_QUEUE_LIMIT)
+_log_ready = False
+
+def get_executor():
+    global _executor, _executor_pid
+    # One background writer per process; threads do not survive fork
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-queries')
+                _executor_pid = os.getpid()
+    return _executor
+
+def ensure_log_collection():
+    global _log_ready
+    if not _log_ready:
+        try:
+            get_db().create_collection(SLOW_QUERIES_COLLECTION, capped=True, size=SLOW_QUERY_LOG_SIZE)
+        except CollectionInvalid:
+            pass  # Already exists
+        _log_ready = True
+
+def record_slow_query(entry, command):
+    try:
+        ensure_log_collection()
+        if entry['shape_key'] not in _explained:
+            _explained.add(entry['shape_key'])
+            if plans_collection.count_documents({"shape_key": entry['shape_key']}, limit=1) == 0:
+                explain = get_client()[entry['database']].command(explain_command(entry['command'], command))
+                plans_collection.update_one(
+                    {"shape_key": entry['shape_key']},
+                    {"$setOnInsert": {
+                        "collection": entry['collection'],
+                        "command": entry['command'],
+                        "shape": entry['shape'],
+                        "plan": plan_summary(explain),
+                        "winning_plan": explain.get('queryPlanner', {}).get('winningPlan'),
+                        "explained_at": entry['at']
+                    }},
+                    upsert=True
+                )
+        slow_queries_collection.insert_one(dict(entry))
+        if SLOW_QUERY_LOG_FILE:
+            logger.warning(json.dumps(entry, default=str))
+    except Exception:
+        # Runs on the background writer; a failure must not go unnoticed
+        logger.exception("Could not record slow query")
+    finally:
+        _slots.release()
+
+class SlowQueryListener(monitoring.CommandListener):
+    # started() runs on the issuing thread, so the route is still known; the
+    # command itself is only kept until its reply arrives
+    def started(self, event):
+        if event.command_name in EXPLAINABLE:
+            _pending[(event.connection_id, event.request_id)] = (event.command, event.database_name, current_route())
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        self._finished(event)
+
+    def _finished(self, event):
+        pending = _pending.pop((event.connection_id, event.request_id), None)
+        duration_ms = event.duration_micros / 1000
+        if pending is None or duration_ms < SLOW_QUERY_MS:
+            return
+        command, database_name, route = pending
+        shape = query_shape(event.command_name, command)
+        collection = command.get(event.command_name)
+        entry = {
+            'route': route,
+            'database': database_name,
+            'collection': collection if isinstance(collection, str) else None,
+            'command': event.command_name,
+            'shape': shape,
+            'shape_key': f"{database_name}.{collection} {event.command_name} {json.dumps(shape, sort_keys=True)}",
+            'duration_ms': round(duration_ms, 3),
+            'at': datetime.utcnow()
+        }
+        # Never block the request on logging: drop entries when the writer is behind
+        if _slots.acquire(blocking=False):
+            get_executor().submit(record_slow_query, entry, command)
+
+_listener = None
+
+def init_slow_query_log():
+    global _listener
+    # Like the metrics listener, this has to be in place before the first
+    # MongoClient is created
+    if _listener is None and SLOW_QUERY_MS > 0:
+        if SLOW_QUERY_LOG_FILE:
+            handler = logging.FileHandler(SLOW_QUERY_LOG_FILE)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+        _listener = SlowQueryListener()
+        monitoring.register(_listener)
+
+def top_offenders(limit=20, since=None):
+    pipeline = []
+    if since:
+        pipeline.append({"$match": {"at": {"$gte": since}}})
+    pipeline += [
+        {"$group": {
+            "_id": "$shape_key",
+            "collection": {"$first": "$collection"},
+            "command": {"$first": "$command"},
+            "shape": {"$first": "$shape"},
+            "routes": {"$addToSet": "$route"},
+            "count": {"$sum": 1},
+            "total_ms": {"$sum": "$duration_ms"},
+            "max_ms": {"$max": "$duration_ms"},
+            "last_seen": {"$max": "$at"}
+        }},
+        {"$sort": {"total_ms": -1}},
+        {"$limit": limit},
+        {"$lookup": {"from": PLANS_COLLECTION, "localField": "_id", "foreignField": "shape_key", "as": "plans"}},
+        {"$project": {
+            "_id": 0,
+            "shape_key": "$_id",
+            "collection": 1,
+            "command": 1,
+            "shape": 1,
+            "routes": 1,
+            "count": 1,
+            "total_ms": {"$round": ["$total_ms", 3]},
+            "avg_ms": {"$round": [{"$divide": ["$total_ms", "$count"]}, 3]},
+            "max_ms": 1,
+            "last_seen": 1,
+            "plan": {"$arrayElemAt": ["$plans.plan", 0]}
+        }}
+    ]
+    return list(slow_queries_collection.aggregate(pipeline))
@@ -0,0 +1,336 @@
+import argparse
+import calendar
+import random
+import struct
+import time
+from datetime import date, datetime, timedelta
+from bson.objectid import ObjectId
+from attendance_rollup import ATTENDANCE_COLLECTIONS, rebuild_rollup
+from database import configure, get_collection
+from fee_ledger import rebuild_balances
+from indexes import ensure_indexes, print_report
+from passwords import hash_password
+from timetable_generator import TimetableError, generate_timetable
+from Controller.staff_controller import build_department_details
+from Controller.student_controller import build_student_doc
+from Controller.teacher_controller import build_experience_section, build_qualifications_section
+from Controller.user_controller import build_user_doc
+
+# Fills the database with a synthetic school. Every number below is per unit
+# of --scale, so --scale 10 gives 5000 students in 200 classes and, over two
+# years of school days, about 2 million student attendance rows.
+SCALE_PROFILE = {
+    'students': 500,
+    'teachers': 30,
+    'staff': 12,
+    'classes': 20,
+}
+GENERATOR_BATCH_SIZE = 10000
+SYNTHETIC_PASSWORD = 'synthetic_password'
+
+SUBJECTS = [
+    ('MATH', 'Mathematics', 6), ('ENG', 'English', 5), ('SCI', 'Science', 5), ('HIST', 'History', 3),
+    ('GEO', 'Geography', 3), ('HIN', 'Hindi', 4), ('CS', 'Computer Science', 3), ('PE', 'Physical Education', 2),
+]
+DEPARTMENTS = [('Administration', 'Clerk'), ('Accounts', 'Accountant'), ('Library', 'Librarian'),
+               ('Transport', 'Driver'), ('Maintenance', 'Technician')]
+FIRST_NAMES = ['Aarav', 'Vivaan', 'Aditya', 'Ananya', 'Diya', 'Ishaan', 'Kavya', 'Meera', 'Rohan', 'Saanvi',
+               'Arjun', 'Priya', 'Kabir', 'Nisha', 'Reyansh', 'Tara', 'Vihaan', 'Zara', 'Yash', 'Pooja']
+LAST_NAMES = ['Sharma', 'Verma', 'Patel', 'Gupta', 'Singh', 'Kumar', 'Reddy', 'Iyer', 'Nair', 'Das',
+              'Mehta', 'Joshi', 'Rao', 'Bose', 'Chopra']
+TOWNS = ['Pune', 'Nagpur', 'Indore', 'Bhopal', 'Jaipur', 'Lucknow', 'Patna', 'Surat']
+OCCUPATIONS = ['Engineer', 'Teacher', 'Doctor', 'Farmer', 'Shopkeeper', 'Clerk', 'Nurse', 'Homemaker']
+WEEK_DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
+PERIODS = [{'start_time': f"{hour:02d}:00", 'end_time': f"{hour:02d}:50"} for hour in (8, 9, 10, 11, 13, 14, 15)]
+GRADES = [(90, 'A+'), (80, 'A'), (70, 'B'), (60, 'C'), (50, 'D'), (40, 'E'), (0, 'F')]
+TERMS = [(4, 'Term 1'), (9, 'Term 2'), (12, 'Final')]
+
+GENERATED_COLLECTIONS = [
+    'users', 'students', 'teachers', 'staff', 'subjects', 'classes', 'timetable', 'exams', 'exam_results',
+    'fees', 'fee_payments', 'fee_balances', 'teacher_salaries', 'staff_salaries', 'salary_structures',
+    'attendance_rollup', *ATTENDANCE_COLLECTIONS.values()
+]
+
+class IdFactory:
+    # Increasing ObjectIds with a fixed timestamp, so the same seed and scale
+    # give the same _id values on every run
+    def __init__(self, start):
+        self.timestamp = calendar.timegm(start.timetuple())
+        self.counter = 0
+
+    def __call__(self):
+        self.counter += 1
+        return ObjectId(struct.pack('>IQ', self.timestamp, self.counter))
+
+def insert_stream(collection_name, docs):
+    # insert_many over a generator in fixed-size batches; memory stays flat
+    collection = get_collection(collection_name)
+    batch, count = [], 0
+    for doc in docs:
+        batch.append(doc)
+        if len(batch) == GENERATOR_BATCH_SIZE:
+            collection.insert_many(batch, ordered=False)
+            count += len(batch)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+        count += len(batch)
+    return count
+
+def school_days(start, years):
+    end = date(start.year + years, start.month, start.day)
+    day = start
+    while day < end:
+        if day.weekday() < 5:
+            yield datetime(day.year, day.month, day.day)
+        day += timedelta(days=1)
+
+def month_starts(start, years):
+    return [datetime(start.year + (start.month - 1 + i) // 12, (start.month - 1 + i) % 12 + 1, 1) for i in range(12 * years)]
+
+def grade_for(score):
+    return next(grade for cutoff, grade in GRADES if score >= cutoff)
+
+def person(rng, gender=None):
+    gender = gender or rng.choice(['male', 'female'])
+    return {
+        'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+        'gender': gender,
+        'town': rng.choice(TOWNS),
+        'phone': f"9{rng.randrange(10 ** 9):09d}",
+    }
+
+def user_data(rng, username, role, birth_year):
+    me = person(rng)
+    father, mother = person(rng, 'male'), person(rng, 'female')
+    address = {'house_number': str(rng.randint(1, 999)), 'town': me['town'], 'state': 'Maharashtra',
+               'country': 'India', 'pincode': f"{rng.randint(400001, 499999)}"}
+    return {
+        'username': username,
+        'role': role,
+        'personal_info': {
+            'name': me['name'],
+            'date_of_birth': f"{birth_year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            'gender': me['gender'],
+            'contact_details': {'email': f"{username}@example.com", 'phone': me['phone']},
+            'category': rng.choice(['General', 'OBC', 'SC', 'ST'])
+        },
+        'parents_info': {
+            'fathers': {'name': father['name'], 'occupation': rng.choice(OCCUPATIONS), 'contact': {'phone': father['phone']}, 'address': address},
+            'mothers': {'name': mother['name'], 'occupation': rng.choice(OCCUPATIONS), 'contact': {'phone': mother['phone']}, 'address': address}
+        },
+        'address': {'permanent_address': address, 'current_address': address},
+    }
+
+def generate_dataset(scale=1, years=2, start=date(2023, 6, 1), seed=0, log=print):
+    rng = random.Random(seed)
+    make_id = IdFactory(start)
+    counts = {key: max(1, round(per_unit * scale)) for key, per_unit in SCALE_PROFILE.items()}
+    hashed = hash_password(SYNTHETIC_PASSWORD)  # One bcrypt hash shared by every generated user
+
+    def step(collection_name, docs):
+        started = time.monotonic()
+        inserted = insert_stream(collection_name, docs)
+        log(f"{collection_name:<20} {inserted:>10} documents in {time.monotonic() - started:.2f}s")
+        return inserted
+
+    # People: every student, teacher and staff member is also a user
+    students = [f"student_{i:06d}" for i in range(counts['students'])]
+    teachers = [f"teacher_{i:05d}" for i in range(counts['teachers'])]
+    staff = [f"staff_{i:05d}" for i in range(counts['staff'])]
+    # Twelve grades of four sections (C01A ... C12D), numbered again past 48
+    sections = {f"C{1 + (i // 4) % 12:02d}{'ABCD'[i % 4]}{i // 48 or ''}": 'ABCD'[i % 4] for i in range(counts['classes'])}
+    classes = list(sections)
+    class_of = {username: classes[i % len(classes)] for i, username in enumerate(students)}
+
+    def user_docs():
+        for usernames, role, birth_years in ((students, 'student', (2008, 2018)), (teachers, 'teacher', (1965, 1995)),
+                                             (staff, 'staff', (1965, 2000))):
+            for username in usernames:
+                doc = build_user_doc(user_data(rng, username, role, rng.randint(*birth_years)), hashed)
+                doc['_id'] = make_id()
+                doc['added_at'] = datetime(start.year, start.month, start.day)
+                yield doc
+    step('users', user_docs())
+
+    def student_docs():
+        roll_numbers = {}
+        for username in students:
+            class_code = class_of[username]
+            roll_numbers[class_code] = roll_numbers.get(class_code, 0) + 1
+            guardian = person(rng)
+            doc = build_student_doc({
+                'username': username,
+                'enrollment_date': start.strftime("%Y-%m-%d"),
+                'class_details': {'current_class': class_code, 'section': sections[class_code], 'roll_number': roll_numbers[class_code]},
+                'guardian_info': {'name': guardian['name'], 'relation': rng.choice(['Father', 'Mother', 'Uncle']),
+                                  'contact': {'phone': guardian['phone']}, 'address': {'town': guardian['town'], 'country': 'India'}}
+            })
+            doc['_id'] = make_id()
+            yield doc
+    step('students', student_docs())
+
+    step('subjects', (
+        {'_id': make_id(), 'subject_code': code, 'name': name, 'description': f"{name} curriculum", 'weekly_periods': periods}
+        for code, name, periods in SUBJECTS
+    ))
+
+    # Teachers cover subjects round-robin; user_name mirrors username because
+    # classes, timetable, attendance and salaries look teachers up by it
+    teacher_subjects = {username: [SUBJECTS[i % len(SUBJECTS)][0], SUBJECTS[(i + 3) % len(SUBJECTS)][0]]
+                        for i, username in enumerate(teachers)}
+    step('teachers', (
+        {
+            '_id': make_id(), 'username': username, 'user_name': username,
+            'hire_date': datetime(rng.randint(2000, start.year - 1), rng.randint(1, 12), 1),
+            'subjects': teacher_subjects[username],
+            'experience': build_experience_section({'years_of_experience': rng.randint(1, 30)}),
+            'qualifications': build_qualifications_section({'degrees': [rng.choice(['B.Ed', 'M.Ed', 'M.Sc', 'M.A'])]}),
+            'updated_at': datetime(start.year, start.month, start.day)
+        }
+        for username in teachers
+    ))
+    staff_departments = {username: DEPARTMENTS[i % len(DEPARTMENTS)] for i, username in enumerate(staff)}
+    step('staff', (
+        {
+            '_id': make_id(), 'username': username, 'user_name': username,
+            'hire_date': datetime(rng.randint(2000, start.year - 1), rng.randint(1, 12), 1),
+            'experience': build_experience_section({'years_of_experience': rng.randint(1, 30)}),
+            'qualifications': build_qualifications_section({}),
+            'department_details': build_department_details(
+                {'department_name': staff_departments[username][0], 'position': staff_departments[username][1]}),
+            'updated_at': datetime(start.year, start.month, start.day)
+        }
+        for username in staff
+    ))
+
+    class_teacher = {class_code: teachers[i % len(teachers)] for i, class_code in enumerate(classes)}
+    first_student = {}
+    for username in students:
+        first_student.setdefault(class_of[username], username)
+    step('classes', (
+        {'_id': make_id(), 'class_code': class_code, 'name': f"Class {class_code}",
+         'teacher_user_name': class_teacher[class_code], 'student_user_name': first_student.get(class_code, '')}
+        for class_code in classes
+    ))
+
+    try:
+        entries = generate_timetable(WEEK_DAYS, PERIODS, classes, seed=seed)
+        for entry in entries:
+            entry['_id'] = make_id()
+        step('timetable', iter(entries))
+    except TimetableError as e:
+        log(f"timetable skipped: {e}")
+
+    # Attendance: a per-person attendance rate, one row per school day
+    days = list(school_days(start, years))
+    def attendance_docs(usernames, user_type, with_class):
+        rates = {username: rng.uniform(0.80, 0.99) for username in usernames}
+        for day in days:
+            for username in usernames:
+                draw = rng.random()
+                status = 'present' if draw < rates[username] else ('absent' if draw < rates[username] + (1 - rates[username]) * 0.7 else 'leave')
+                doc = {'_id': make_id(), 'user_name': username, 'user_type': user_type, 'date': day, 'status': status}
+                if with_class:
+                    doc['class_code'] = class_of[username]
+                yield doc
+    step('student_attendance', attendance_docs(students, 'student', True))
+    step('teacher_attendance', attendance_docs(teachers, 'teacher', False))
+    step('staff_attendance', attendance_docs(staff, 'staff', False))
+
+    # Exams: every class sits every subject each term
+    exams = []
+    for year in range(years):
+        for month, description in TERMS:
+            exam_year = start.year + year + (1 if month < start.month else 0)
+            for class_code in classes:
+                for code, name, _ in SUBJECTS:
+                    exams.append({
+                        '_id': make_id(), 'class_code': class_code, 'subject_code': code,
+                        'exam_date': datetime(exam_year, month, rng.randint(1, 25)),
+                        'description': f"{description} {name} {exam_year}"
+                    })
+    step('exams', iter(exams))
+
+    students_by_class = {}
+    for username in students:
+        students_by_class.setdefault(class_of[username], []).append(username)
+    ability = {username: rng.gauss(65, 12) for username in students}
+    def result_docs():
+        for exam in exams:
+            exam_id = str(exam['_id'])
+            for username in students_by_class.get(exam['class_code'], []):
+                score = int(min(100, max(0, rng.gauss(ability[username], 10))))
+                yield {'_id': make_id(), 'student': username, 'exam': exam_id, 'score': score, 'grade': grade_for(score)}
+    step('exam_results', result_docs())
+
+    # Quarterly fees; most are paid in full by the due date, some partly
+    months = month_starts(start, years)
+    fees, payments = [], []
+    for username in students:
+        for month in months[::3]:
+            amount = 3000
+            due_date = month + timedelta(days=14)
+            paid = rng.choice([amount, amount, amount, amount // 2, 0])
+            fee = {'_id': make_id(), 'student_username': username, 'amount': amount, 'due_date': due_date,
+                   'paid_amount': paid, 'status': 'paid' if paid == amount else ('partial' if paid else 'pending')}
+            fees.append(fee)
+            if paid:
+                payments.append({'_id': make_id(), 'fee_id': fee['_id'], 'student_username': username,
+                                 'amount': paid, 'payment_date': due_date - timedelta(days=rng.randint(0, 10)),
+                                 'method': rng.choice(['cash', 'upi', 'card', 'bank_transfer'])})
+    step('fees', iter(fees))
+    step('fee_payments', iter(payments))
+
+    # Salary structures and one paid payroll record per month
+    structures = {}
+    for usernames, user_type in ((teachers, 'teacher'), (staff, 'staff')):
+        for username in usernames:
+            basic = rng.randrange(25000, 80000, 1000)
+            structures[username] = {
+                '_id': make_id(), 'user_type': user_type, 'user_name': username, 'basic': basic,
+                'allowances': {'hra': basic // 5, 'transport': 1600}, 'deductions': {'pf': basic * 12 // 100},
+                'department': staff_departments[username][0] if user_type == 'staff' else 'Teaching',
+                'updated_at': datetime(start.year, start.month, start.day)
+            }
+    step('salary_structures', iter(structures.values()))
+    for user_type, collection_name in (('teacher', 'teacher_salaries'), ('staff', 'staff_salaries')):
+        step(collection_name, (
+            {
+                '_id': make_id(), 'user_name': structure['user_name'], 'user_type': user_type,
+                'payroll_month': month.strftime("%Y-%m"), 'department': structure['department'],
+                'gross': structure['basic'] + sum(structure['allowances'].values()),
+                'deductions': sum(structure['deductions'].values()),
+                'amount': structure['basic'] + sum(structure['allowances'].values()) - sum(structure['deductions'].values()),
+                'payment_date': month + timedelta(days=27), 'status': 'paid'
+            }
+            for month in months for structure in structures.values() if structure['user_type'] == user_type
+        ))
+
+    # Derived collections are rebuilt from what was inserted
+    for user_type in ATTENDANCE_COLLECTIONS:
+        rebuild_rollup(user_type)
+    log(f"{'fee_balances':<20} {rebuild_balances():>10} documents")
+    return counts
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a synthetic school dataset")
+    parser.add_argument('--scale', type=float, default=1.0, help="1 = 500 students, 30 teachers, 12 staff, 20 classes")
+    parser.add_argument('--years', type=int, default=2, help="years of attendance, exams, fees and salaries")
+    parser.add_argument('--start', default='2023-06-01', help="first day of the generated period")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db', help="MongoDB database name (defaults to MONGO_DB_NAME)")
+    parser.add_argument('--drop', action='store_true', help="drop the generated collections first")
+    args = parser.parse_args()
+
+    if args.db:
+        configure(db_name=args.db)
+    if args.drop:
+        for collection_name in GENERATED_COLLECTIONS:
+            get_collection(collection_name).drop()
+
+    started = time.monotonic()
+    generate_dataset(args.scale, args.years, datetime.strptime(args.start, "%Y-%m-%d").date(), args.seed)
+    # Indexes last: building them once is much faster than maintaining them per insert
+    print_report(ensure_indexes())
+    print(f"Done in {time.monotonic() - started:.1f}s")
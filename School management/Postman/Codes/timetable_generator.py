@@ -0,0 +1,172 @@
+import random
+import time
+from database import get_collection
+
+GENERATOR_ATTEMPTS = 20
+GENERATOR_TIME_LIMIT = 10.0
+
+classes_collection = get_collection('classes')
+subjects_collection = get_collection('subjects')
+teachers_collection = get_collection('teachers')
+timetable_collection = get_collection('timetable')
+
+class TimetableError(Exception):
+    pass
+
+def load_requirements(class_codes, requirements):
+    # Weekly periods per class and subject: from the request, falling back to
+    # every subject that declares weekly_periods
+    default = {
+        doc['subject_code']: int(doc['weekly_periods'])
+        for doc in subjects_collection.find({"weekly_periods": {"$gt": 0}}, {"subject_code": 1, "weekly_periods": 1})
+    }
+    return {class_code: requirements.get(class_code, default) for class_code in class_codes}
+
+def load_teachers():
+    teachers = {}
+    for doc in teachers_collection.find({}, {"username": 1, "subjects": 1}):
+        for subject in doc.get('subjects', []):
+            teachers.setdefault(subject, []).append(doc['username'])
+    return teachers
+
+def load_busy_teachers(class_codes):
+    # Teacher bookings in classes that are not being regenerated
+    busy = set()
+    query = {"class_code": {"$nin": list(class_codes)}, "teacher_user_name": {"$exists": True}}
+    for doc in timetable_collection.find(query, {"teacher_user_name": 1, "day_of_week": 1, "start_time": 1}):
+        busy.add((doc['teacher_user_name'], doc['day_of_week'], doc['start_time']))
+    return busy
+
+def assign_teachers(requirements, teachers, capacity):
+    # Give each class/subject pair the least-loaded qualified teacher
+    load = {}
+    assignment = {}
+    pairs = sorted(
+        ((class_code, subject, periods) for class_code, subjects in requirements.items() for subject, periods in subjects.items()),
+        key=lambda pair: (len(teachers.get(pair[1], [])), -pair[2])
+    )
+    for class_code, subject, periods in pairs:
+        candidates = teachers.get(subject)
+        if not candidates:
+            raise TimetableError(f"No teacher is assigned to subject {subject}")
+        teacher = min(candidates, key=lambda name: load.get(name, 0))
+        if load.get(teacher, 0) + periods > capacity:
+            raise TimetableError(f"Not enough teacher periods for subject {subject}")
+        load[teacher] = load.get(teacher, 0) + periods
+        assignment[(class_code, subject)] = teacher
+    return assignment, load
+
+class Schedule:
+    def __init__(self, slots, busy):
+        self.slots = slots
+        self.class_at = {}
+        self.teacher_busy = set(busy)
+        self.subject_days = {}
+
+    def free(self, lesson, slot):
+        class_code, _, teacher = lesson
+        return (class_code, slot) not in self.class_at and (teacher, slot) not in self.teacher_busy
+
+    def place(self, lesson, slot):
+        class_code, subject, teacher = lesson
+        self.class_at[(class_code, slot)] = lesson
+        self.teacher_busy.add((teacher, slot))
+        key = (class_code, subject, slot[0])
+        self.subject_days[key] = self.subject_days.get(key, 0) + 1
+
+    def unplace(self, lesson, slot):
+        class_code, subject, teacher = lesson
+        del self.class_at[(class_code, slot)]
+        self.teacher_busy.discard((teacher, slot))
+        self.subject_days[(class_code, subject, slot[0])] -= 1
+
+    def score(self, lesson, slot):
+        # Prefer spreading a subject across the week
+        return self.subject_days.get((lesson[0], lesson[1], slot[0]), 0)
+
+    def place_best(self, lesson, rng):
+        options = [slot for slot in self.slots if self.free(lesson, slot)]
+        if not options:
+            return False
+        rng.shuffle(options)
+        self.place(lesson, min(options, key=lambda slot: self.score(lesson, slot)))
+        return True
+
+    def place_with_swap(self, lesson):
+        # Free a slot where the teacher is available by moving the class's
+        # lesson there to another slot both it and the class can use
+        class_code, _, teacher = lesson
+        for slot in self.slots:
+            if (teacher, slot) in self.teacher_busy:
+                continue
+            other = self.class_at.get((class_code, slot))
+            if other is None:
+                continue
+            for target in self.slots:
+                if target != slot and self.free(other, target):
+                    self.unplace(other, slot)
+                    self.place(other, target)
+                    self.place(lesson, slot)
+                    return True
+        return False
+
+def build_schedule(lessons, load, slots, busy, seed=None):
+    rng = random.Random(seed)
+    deadline = time.monotonic() + GENERATOR_TIME_LIMIT
+    for _ in range(GENERATOR_ATTEMPTS):
+        # Most constrained first: lessons of the busiest teachers
+        ordered = sorted(lessons, key=lambda lesson: (-load[lesson[2]], rng.random()))
+        schedule = Schedule(slots, busy)
+        for lesson in ordered:
+            if not (schedule.place_best(lesson, rng) or schedule.place_with_swap(lesson)):
+                break
+        else:
+            return schedule
+        if time.monotonic() > deadline:
+            break
+    raise TimetableError("Could not find a clash-free timetable; add slots or teachers")
+
+def generate_timetable(days, slot_times, class_codes=None, requirements=None, seed=None):
+    if class_codes is None:
+        class_codes = [doc['class_code'] for doc in classes_collection.find({}, {"class_code": 1})]
+    requirements = load_requirements(class_codes, requirements or {})
+
+    slots = [(day, slot['start_time']) for day in days for slot in slot_times]
+    end_times = {slot['start_time']: slot['end_time'] for slot in slot_times}
+    for class_code, subjects in requirements.items():
+        if sum(subjects.values()) > len(slots):
+            raise TimetableError(f"Class {class_code} needs more periods than there are slots")
+
+    assignment, load = assign_teachers(requirements, load_teachers(), len(slots))
+    lessons = [
+        (class_code, subject, assignment[(class_code, subject)])
+        for class_code, subjects in requirements.items()
+        for subject, periods in subjects.items()
+        for _ in range(periods)
+    ]
+    busy = {(teacher, (day, start)) for teacher, day, start in load_busy_teachers(class_codes)}
+    schedule = build_schedule(lessons, load, slots, busy, seed)
+
+    entries = []
+    for class_code in requirements:
+        for day, start in slots:
+            lesson = schedule.class_at.get((class_code, (day, start)))
+            if lesson is None:
+                continue
+            entries.append({
+                'class_code': class_code,
+                'subject_code': lesson[1],
+                'teacher_user_name': lesson[2],
+                'day_of_week': day,
+                'start_time': start,
+                'end_time': end_times[start],
+                'generated': True
+            })
+    return entries
+
+def save_timetable(entries, class_codes):
+    # Replace the generated classes' timetable in one delete and one bulk insert
+    timetable_collection.delete_many({"class_code": {"$in": list(class_codes)}})
+    if entries:
+        timetable_collection.insert_many(entries, ordered=False)
+    return len(entries)
@@ -0,0 +1,159 @@
+import bisect
+import os
+import threading
+import time
+from database import get_collection
+
+# Resources that cannot be double-booked, as entry field -> resource name
+TIMETABLE_RESOURCES = {
+    'class_code': 'class',
+    'teacher_user_name': 'teacher',
+    'room': 'room'
+}
+
+# Each worker keeps its own index; reload it periodically so bookings made
+# through other workers are picked up.
+TIMETABLE_INDEX_REFRESH = float(os.environ.get('TIMETABLE_INDEX_REFRESH', 60))
+
+timetable_collection = get_collection('timetable')
+
+def to_minutes(value):
+    hours, minutes = value.split(':')
+    return int(hours) * 60 + int(minutes)
+
+def entry_interval(entry):
+    start, end = to_minutes(entry['start_time']), to_minutes(entry['end_time'])
+    if start >= end:
+        raise ValueError("start_time must be before end_time")
+    return start, end
+
+def is_scheduled(entry):
+    # Entries without a day and times (allowed since the first version) can't clash
+    return all(entry.get(field) for field in ('day_of_week', 'start_time', 'end_time'))
+
+def entry_slots(entry):
+    # One (resource, value, day) key per bookable resource on the entry
+    return [
+        (resource, entry[field], entry['day_of_week'])
+        for field, resource in TIMETABLE_RESOURCES.items() if entry.get(field)
+    ]
+
+class TimetableIndex:
+    # Per resource and day, bookings sorted by start time, plus the longest
+    # booking seen for that day. Loaded entries may already overlap, so the
+    # backward scan can't stop at the first booking that ends before our
+    # start; it stops once no earlier booking is long enough to reach it.
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._slots = {}
+        self._longest = {}
+        self._entries = {}
+        self._loaded_at = None
+
+    def load(self, entries):
+        with self._lock:
+            self._slots = {}
+            self._longest = {}
+            self._entries = {}
+            for entry in entries:
+                try:
+                    self._insert(str(entry['_id']), entry)
+                except (KeyError, ValueError):
+                    continue  # Entries without valid times can't clash
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+    def ensure_loaded(self):
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at > TIMETABLE_INDEX_REFRESH:
+                self.load(timetable_collection.find({}, {
+                    'day_of_week': 1, 'start_time': 1, 'end_time': 1, **{field: 1 for field in TIMETABLE_RESOURCES}
+                }))
+
+    def _insert(self, entry_id, entry):
+        start, end = entry_interval(entry)
+        keys = entry_slots(entry)
+        for key in keys:
+            bisect.insort(self._slots.setdefault(key, []), (start, end, entry_id))
+            # Never lowered on removal; a longer bound only widens the scan
+            self._longest[key] = max(self._longest.get(key, 0), end - start)
+        self._entries[entry_id] = (keys, start, end)
+
+    def _clashes(self, entry, ignore_id=None):
+        start, end = entry_interval(entry)
+        clashes = []
+        for key in entry_slots(entry):
+            bookings = self._slots.get(key, [])
+            position = bisect.bisect_left(bookings, (start,))
+            # Earlier bookings that run past our start
+            earliest = start - self._longest.get(key, 0)
+            i = position - 1
+            while i >= 0 and bookings[i][0] >= earliest:
+                if bookings[i][1] > start and bookings[i][2] != ignore_id:
+                    clashes.append({"resource": key[0], "value": key[1], "entry_id": bookings[i][2]})
+                i -= 1
+            # Later bookings that begin before our end
+            i = position
+            while i < len(bookings) and bookings[i][0] < end:
+                if bookings[i][2] != ignore_id:
+                    clashes.append({"resource": key[0], "value": key[1], "entry_id": bookings[i][2]})
+                i += 1
+        return clashes
+
+    def reserve(self, entry_id, entry, replaces=None):
+        # Check and book in one step; returns the clashes, or [] once booked
+        with self._lock:
+            self.ensure_loaded()
+            if not is_scheduled(entry):
+                if replaces is not None:
+                    self._remove(replaces)
+                return []
+            clashes = self._clashes(entry, ignore_id=replaces)
+            if not clashes:
+                if replaces is not None:
+                    self._remove(replaces)
+                self._insert(entry_id, entry)
+            return clashes
+
+    def _remove(self, entry_id):
+        keys, start, end = self._entries.pop(entry_id, ([], None, None))
+        for key in keys:
+            bookings = self._slots.get(key, [])
+            position = bisect.bisect_left(bookings, (start, end, entry_id))
+            if position < len(bookings) and bookings[position] == (start, end, entry_id):
+                bookings.pop(position)
+
+    def remove(self, entry_id):
+        with self._lock:
+            self._remove(entry_id)
+
+    def restore(self, entry_id, entry):
+        # Put back a booking after a failed write
+        with self._lock:
+            self._remove(entry_id)
+            try:
+                self._insert(entry_id, entry)
+            except (KeyError, ValueError):
+                pass
+
+    def all_clashes(self):
+        # Overlapping pairs already stored, e.g. from before clash checking existed
+        with self._lock:
+            self.ensure_loaded()
+            found = []
+            for key, bookings in self._slots.items():
+                latest_end, latest_id = None, None
+                for start, end, entry_id in bookings:
+                    if latest_end is not None and start < latest_end:
+                        found.append({
+                            "resource": key[0], "value": key[1], "day_of_week": key[2],
+                            "entry_ids": [latest_id, entry_id]
+                        })
+                    if latest_end is None or end > latest_end:
+                        latest_end, latest_id = end, entry_id
+            return found
+
+timetable_index = TimetableIndex()
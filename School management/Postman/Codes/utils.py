@@ -1,16 +1,40 @@
-from pymongo import MongoClient
-import bcrypt
+from database import get_collection
+from datetime import datetime, timezone
+from json_provider import mongo_default
+from passwords import PasswordPoolBusy, check_password, hash_password, needs_rehash
+from reference_cache import reference_exists
+from response_cache import invalidate_response
 
 # Configure MongoDB
-client = MongoClient("mongodb://localhost:27017/")
-db = client['School']
-collection = db['users']
+collection = get_collection('users')
+students_collection = get_collection('students')
 
 def validate_user(username, password):
     user = collection.find_one({"username": username})
-    if user and bcrypt.checkpw(password.encode('utf-8'), user['password']):
+    if user and check_password(password, user['password']):
+        # Upgrade hashes made with a different work factor while we have the
+        # plaintext; best effort, so a busy pool never fails a good login
+        if needs_rehash(user['password']):
+            try:
+                user['password'] = hash_password(password)
+            except PasswordPoolBusy:
+                return user
+            collection.update_one({"_id": user['_id']}, {"$set": {"password": user['password']}})
+            invalidate_response('user', username)
         return user
     return None
 
 def user_exists(username):
-    return collection.find_one({"username": username}) is not None
+    return reference_exists('user', username)
+
+def class_members(class_code):
+    # Usernames of the students currently enrolled in a class
+    cursor = students_collection.find({"class_details.current_class": class_code}, {"username": 1, "_id": 0})
+    return [doc['username'] for doc in cursor]
+
+def json_value(value):
+    # One stored value as the JSON provider writes it: naive datetimes are
+    # UTC, other BSON types go through mongo_default
+    if isinstance(value, datetime):
+        return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).isoformat()
+    return mongo_default(value)